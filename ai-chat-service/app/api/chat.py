@@ -1,4 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, Form
+from starlette.concurrency import run_in_threadpool
 from app.utils.csv_loader import load_csv
 from app.services.intent import detect_intent
 from app.services.forecast import (
@@ -7,29 +8,33 @@ from app.services.forecast import (
     next_month_prediction,
     get_seasonal_trends,
     get_abc_analysis,
-    get_eoq_data
+    get_eoq_data,
+    analyze_profitability
 )
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+# Intent -> analysis handler. Handlers are CPU-bound and run in the threadpool.
+INTENT_HANDLERS = {
+    "HISTORICAL": historical_summary,
+    "BEST_PRODUCT": best_selling_product,
+    "FORECAST": next_month_prediction,
+    "SEASONAL": get_seasonal_trends,
+    "PROFITABILITY": analyze_profitability,
+    "ABC_ANALYSIS": lambda df: {"abc_data": get_abc_analysis(df)},
+    "INVENTORY_OPTIMIZATION": lambda df: {"inventory_optimization": get_eoq_data(df)},
+}
+
 @router.post("")
 async def chat(questions: str = Form(...), file: UploadFile = File(...)):
-    df = load_csv(file)
+    df = await load_csv(file)
     intent = detect_intent(questions)
 
-    if intent == "HISTORICAL":
-        answer = historical_summary(df)
-    elif intent == "BEST_PRODUCT":
-        answer = best_selling_product(df)
-    elif intent == "FORECAST":
-        answer = next_month_prediction(df)
-    elif intent == "SEASONAL":
-        answer = get_seasonal_trends(df)
-    elif intent == "ABC_ANALYSIS":
-        answer = {"abc_data": get_abc_analysis(df)}
-    elif intent == "INVENTORY_OPTIMIZATION":
-        answer = {"inventory_optimization": get_eoq_data(df)}
-    else:
+    handler = INTENT_HANDLERS.get(intent)
+    if handler is None:
         answer = {"message": "Intent not recognized. Try asking about forecasts, trends, or ABC analysis."}
+    else:
+        # Keep the event loop free while pandas/statsmodels crunch the upload
+        answer = await run_in_threadpool(handler, df)
 
-    return {"question": questions, "intent": intent, "answer": answer}
\ No newline at end of file
+    return {"question": questions, "intent": intent, "answer": answer}
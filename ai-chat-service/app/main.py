@@ -1,7 +1,14 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.chat import router as chat_router
+from app.services.forecast import warm_up_forecast_model
 
-app = FastAPI(title="AI Chat Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_forecast_model()
+    yield
+
+app = FastAPI(title="AI Chat Service", lifespan=lifespan)
 
 app.include_router(chat_router)
 
@@ -1,407 +1,74 @@
-# import pandas as pd
-# import numpy as np
-# import math
-# from prophet import Prophet
-# from tensorflow.keras.models import Sequential
-# from tensorflow.keras.layers import LSTM, Dense, Dropout
-# from sklearn.preprocessing import MinMaxScaler
-#
-# def train_lstm_on_residuals(residuals, lookback=7):
-#     scaler = MinMaxScaler(feature_range=(0, 1))
-#     scaled_res = scaler.fit_transform(residuals.reshape(-1, 1))
-#     X, y = [], []
-#     for i in range(lookback, len(scaled_res)):
-#         X.append(scaled_res[i-lookback:i, 0])
-#         y.append(scaled_res[i, 0])
-#     X, y = np.array(X), np.array(y)
-#     X = np.reshape(X, (X.shape[0], X.shape[1], 1))
-#     model = Sequential([
-#         LSTM(32, activation='relu', input_shape=(lookback, 1), return_sequences=True),
-#         Dropout(0.1),
-#         LSTM(32, activation='relu'),
-#         Dense(1)
-#     ])
-#     model.compile(optimizer='adam', loss='mse')
-#     model.fit(X, y, epochs=5, batch_size=16, verbose=0)
-#     return model, scaler
-#
-# def predict_future_residuals(model, scaler, last_residuals, steps=30, lookback=7):
-#     current_batch = scaler.transform(last_residuals[-lookback:].reshape(-1, 1))
-#     current_batch = current_batch.reshape((1, lookback, 1))
-#     corrections = []
-#     for _ in range(steps):
-#         next_pred = model.predict(current_batch, verbose=0)[0]
-#         corrections.append(next_pred)
-#         current_batch = np.append(current_batch[:, 1:, :], [[next_pred]], axis=1)
-#     return scaler.inverse_transform(np.array(corrections).reshape(-1, 1)).flatten()
-#
-# def historical_summary(df: pd.DataFrame):
-#     if "revenue" in df.columns:
-#         total_revenue = df["revenue"].sum()
-#         total_orders = len(df)
-#         return {"total_revenue": float(total_revenue), "total_orders": total_orders}
-#     if "Metric" in df.columns:
-#         rev_row = df[df['Metric'] == 'Revenue']['Value'].values
-#         revenue = rev_row[0] if len(rev_row) > 0 else "0"
-#         return {"summary_revenue": revenue}
-#     return {"message": "Could not calculate totals from this file format."}
-#
-# def best_selling_product(df: pd.DataFrame):
-#     if "Product Name" in df.columns:
-#         top_product = df["Product Name"].iloc[0]
-#         return f"Your top product is {top_product}"
-#     if "product" in df.columns and "quantity" in df.columns:
-#         product = df.groupby("product")["quantity"].sum().idxmax()
-#         return product
-#     return "Could not find product data. Please check your CSV column headers."
-#
-# def analyze_profitability(df: pd.DataFrame):
-#     if "cost_price" in df.columns and "revenue" in df.columns:
-#         df['profit'] = df['revenue'] - (df['cost_price'] * df['quantity'])
-#         profit_by_product = df.groupby("product")["profit"].sum()
-#         best_p = profit_by_product.idxmax()
-#         total_p = profit_by_product.max()
-#         return {
-#             "best_profitable_product": best_p,
-#             "total_profit_earned": f"₹{total_p:,.2f}",
-#             "message": f"The {best_p} is your most profitable item."
-#         }
-#     return "I need cost data to calculate profit."
-#
-# def next_month_prediction(df: pd.DataFrame):
-#     try:
-#         df['date'] = pd.to_datetime(df['date'])
-#         daily_sales = df.groupby('date')['revenue'].sum().reset_index()
-#         lookback = 7
-#         m_total = Prophet(yearly_seasonality=False, weekly_seasonality=True, daily_seasonality=False, uncertainty_samples=0)
-#         m_total.fit(daily_sales.rename(columns={'date': 'ds', 'revenue': 'y'}))
-#         hist_forecast = m_total.predict(daily_sales.rename(columns={'date': 'ds'}))
-#         residuals = daily_sales['revenue'].values - hist_forecast['yhat'].values
-#         if len(residuals) > lookback + 5:
-#             lstm_model, scaler = train_lstm_on_residuals(residuals, lookback)
-#             corrections = predict_future_residuals(lstm_model, scaler, residuals, steps=30, lookback=lookback)
-#         else:
-#             corrections = np.zeros(30)
-#         future_total = m_total.make_future_dataframe(periods=30)
-#         forecast_total = m_total.predict(future_total)
-#         prophet_30d = forecast_total.iloc[-30:]['yhat'].values
-#         hybrid_30d = prophet_30d + corrections
-#         total_predicted = hybrid_30d.sum()
-#         product_results = []
-#         unique_products = df['product'].unique()
-#         for prod in unique_products:
-#             prod_df = df[df['product'] == prod].groupby('date')['quantity'].sum().reset_index()
-#             if len(prod_df) > 10:
-#                 m_prod = Prophet(yearly_seasonality=False, weekly_seasonality=True, daily_seasonality=False, uncertainty_samples=0)
-#                 m_prod.fit(prod_df.rename(columns={'date': 'ds', 'quantity': 'y'}))
-#                 f_prod = m_prod.make_future_dataframe(periods=30)
-#                 p_prod = m_prod.predict(f_prod)
-#                 pred_qty = p_prod.iloc[-30:]['yhat'].sum()
-#             else:
-#                 pred_qty = prod_df['quantity'].mean() * 30
-#             avg_price = (df[df['product'] == prod]['revenue'] / df[df['product'] == prod]['quantity']).mean()
-#             product_results.append({
-#                 "product": prod,
-#                 "predicted_qty": round(float(pred_qty), 0),
-#                 "expected_revenue": round(float(pred_qty * avg_price), 2)
-#             })
-#         top_buy = sorted(product_results, key=lambda x: x['predicted_qty'], reverse=True)[:10]
-#         dead_stock = sorted(product_results, key=lambda x: x['predicted_qty'])[:10]
-#         return {
-#             "forecast_30d_total": f"₹{max(0, total_predicted):,.2f}",
-#             "methodology": "Hybrid Deep Learning (Prophet + LSTM)",
-#             "top_buy_list": top_buy,
-#             "least_priority_list": dead_stock,
-#             "message": f"AI Hybrid Forecast complete. Refined by LSTM. Stock up on {top_buy[0]['product']}."
-#         }
-#     except Exception as e:
-#         return {"error": str(e)}
-#
-# def yearly_forecast_logic(df: pd.DataFrame):
-#     daily_sales = df.groupby('date')['revenue'].sum().reset_index()
-#     model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False, uncertainty_samples=0)
-#     model.fit(daily_sales.rename(columns={'date': 'ds', 'revenue': 'y'}))
-#     future = model.make_future_dataframe(periods=365)
-#     forecast = model.predict(future)
-#     return forecast
-# tensorflow==2.16.1
-import pandas as pd
-import numpy as np
-from prophet import Prophet
-from sklearn.linear_model import LinearRegression
-
-# def historical_summary(df: pd.DataFrame):
-#     if "revenue" in df.columns:
-#         total_revenue = df["revenue"].sum()
-#         total_orders = len(df)
-#         return {"total_revenue": float(total_revenue), "total_orders": total_orders}
-#     return {"message": "Could not calculate totals from this file format."}
-#
-# def best_selling_product(df: pd.DataFrame):
-#     if "product" in df.columns and "quantity" in df.columns:
-#         product = df.groupby("product")["quantity"].sum().idxmax()
-#         return f"Your top product is {product}"
-#     return "Could not find product data."
-#
-# def analyze_profitability(df: pd.DataFrame):
-#     if "cost_price" in df.columns and "revenue" in df.columns and "quantity" in df.columns:
-#         df['profit'] = df['revenue'] - (df['cost_price'] * df['quantity'])
-#         profit_by_product = df.groupby("product")["profit"].sum().reset_index()
-#
-#         # Returns top 10 profitable items
-#         top_profitable = profit_by_product.nlargest(10, 'profit').to_dict('records')
-#         best_p = profit_by_product.loc[profit_by_product['profit'].idxmax()]
-#
-#         return {
-#             "best_profitable_product": best_p['product'],
-#             "total_profit_earned": f"₹{best_p['profit']:,.2f}",
-#             "top_buy_list": [{"product": r['product'], "profit": r['profit']} for r in top_profitable],
-#             "message": f"The {best_p['product']} is your most profitable item."
-#         }
-#     return "I need 'cost_price', 'revenue', and 'quantity' columns to calculate profit."
-#
-# def get_seasonal_trends(df: pd.DataFrame):
-#     """
-#     Groups data by month and identifies the top 3 products based on QUANTITY.
-#     """
-#     try:
-#         df['date'] = pd.to_datetime(df['date'])
-#         df['month_name'] = df['date'].dt.strftime('%B')
-#
-#         month_order = ["January", "February", "March", "April", "May", "June",
-#                        "July", "August", "September", "October", "November", "December"]
-#
-#         # CHANGE: We now group by 'quantity' instead of 'revenue' to see what's popular
-#         monthly_prod_sales = df.groupby(['month_name', 'product'])['quantity'].sum().reset_index()
-#         available_months = [m for m in month_order if m in monthly_prod_sales['month_name'].unique()]
-#
-#         seasonal_report = []
-#         for month in available_months:
-#             month_data = monthly_prod_sales[monthly_prod_sales['month_name'] == month]
-#             # Identifying top 3 based on unit volume
-#             top_3 = month_data.nlargest(3, 'quantity')
-#
-#             products_list = []
-#             for _, row in top_3.iterrows():
-#                 # We still keep revenue in the display for the UI
-#                 rev = df[(df['month_name'] == month) & (df['product'] == row['product'])]['revenue'].sum()
-#                 products_list.append({
-#                     "name": row['product'],
-#                     "revenue": float(rev),
-#                     "quantity": int(row['quantity']) # Adding quantity back to the data
-#                 })
-#
-#             seasonal_report.append({
-#                 "month": month,
-#                 "top_products": products_list
-#             })
-#
-#         # Best month is still usually determined by total revenue
-#         best_month_name = df.groupby('month_name')['revenue'].sum().idxmax()
-#
-#         return {
-#             "most_promising_month": best_month_name,
-#             "monthly_breakdown": seasonal_report,
-#             "message": f"Market analysis identifies {best_month_name} as your peak demand period."
-#         }
-#     except Exception as e:
-#         return {"error": str(e)}
-#
-# def next_month_prediction(df: pd.DataFrame):
-#     """
-#     Generates a 30-day forecast and identifies the top 10 best and 10 lowest performing products.
-#     """
-#     try:
-#         df['date'] = pd.to_datetime(df['date'])
-#         daily_sales = df.groupby('date')['revenue'].sum().reset_index()
-#
-#         if len(daily_sales) < 10:
-#             X = np.array(range(len(daily_sales))).reshape(-1, 1)
-#             y = daily_sales['revenue'].values
-#             model = LinearRegression().fit(X, y)
-#             total_predicted = np.sum(model.predict(np.array(range(len(daily_sales), len(daily_sales) + 30)).reshape(-1, 1)))
-#             method = "Linear Trend"
-#         else:
-#             m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-#             m.fit(daily_sales.rename(columns={'date': 'ds', 'revenue': 'y'}))
-#             forecast = m.predict(m.make_future_dataframe(periods=30))
-#             total_predicted = forecast.iloc[-30:]['yhat'].sum()
-#             method = "Prophet Seasonal Model"
-#
-#         unique_products = df['product'].unique()
-#         product_results = []
-#         total_hist_revenue = df['revenue'].sum()
-#
-#         for prod in unique_products:
-#             prod_df = df[df['product'] == prod]
-#             revenue_share = prod_df['revenue'].sum() / total_hist_revenue if total_hist_revenue > 0 else 0
-#             expected_prod_rev = total_predicted * revenue_share
-#
-#             # Use unit price to estimate quantity
-#             avg_price = (prod_df['revenue'] / prod_df['quantity']).mean()
-#             predicted_qty = expected_prod_rev / avg_price if avg_price > 0 else 0
-#
-#             product_results.append({
-#                 "product": prod,
-#                 "predicted_qty": round(float(predicted_qty), 0),
-#                 "expected_revenue": round(float(expected_prod_rev), 2)
-#             })
-#
-#         # Return TOP 10 and LEAST 10
-#         return {
-#             "forecast_30d_total": f"₹{max(0, total_predicted):,.2f}",
-#             "methodology": method,
-#             "top_buy_list": sorted(product_results, key=lambda x: x['predicted_qty'], reverse=True)[:10],
-#             "least_priority_list": sorted(product_results, key=lambda x: x['predicted_qty'])[:10],
-#             "message": f"Forecast generated using {method}. High demand expected for {product_results[0]['product']}."
-#         }
-#     except Exception as e:
-#         return {"error": str(e)}
-
-# import pandas as pd
-# import numpy as np
-# from prophet import Prophet
-# from sklearn.linear_model import LinearRegression
-#
-# def get_abc_analysis(df: pd.DataFrame):
-#     items = df.groupby('product')['revenue'].sum().sort_values(ascending=False).reset_index()
-#     total_rev = items['revenue'].sum()
-#     items['running_sum'] = items['revenue'].cumsum()
-#     abc_results = []
-#     for _, row in items.iterrows():
-#         share = (row['running_sum'] / total_rev) * 100
-#         category = "A" if share <= 70 else "B" if share <= 90 else "C"
-#         abc_results.append({
-#             "product": row['product'],
-#             "category": category,
-#             "revenue": float(row['revenue'])
-#         })
-#     return abc_results
-#
-# def get_seasonal_trends(df: pd.DataFrame):
-#     try:
-#         df['date'] = pd.to_datetime(df['date'])
-#         df['month_name'] = df['date'].dt.strftime('%B')
-#         month_order = ["January", "February", "March", "April", "May", "June",
-#                        "July", "August", "September", "October", "November", "December"]
-#         monthly_prod_sales = df.groupby(['month_name', 'product'])['quantity'].sum().reset_index()
-#         available_months = [m for m in month_order if m in monthly_prod_sales['month_name'].unique()]
-#         seasonal_report = []
-#         for month in available_months:
-#             month_data = monthly_prod_sales[monthly_prod_sales['month_name'] == month]
-#             top_3 = month_data.nlargest(3, 'quantity')
-#             products_list = []
-#             for _, row in top_3.iterrows():
-#                 rev = df[(df['month_name'] == month) & (df['product'] == row['product'])]['revenue'].sum()
-#                 products_list.append({"name": row['product'], "revenue": float(rev), "quantity": int(row['quantity'])})
-#             seasonal_report.append({"month": month, "top_products": products_list})
-#         best_month_name = df.groupby('month_name')['revenue'].sum().idxmax()
-#         return {"most_promising_month": best_month_name, "monthly_breakdown": seasonal_report}
-#     except Exception as e:
-#         return {"error": str(e)}
-#
-# def next_month_prediction(df: pd.DataFrame):
-#     try:
-#         df['date'] = pd.to_datetime(df['date'])
-#         daily_sales = df.groupby('date')['revenue'].sum().reset_index()
-#         if len(daily_sales) < 10:
-#             X = np.array(range(len(daily_sales))).reshape(-1, 1)
-#             y = daily_sales['revenue'].values
-#             model = LinearRegression().fit(X, y)
-#             total_predicted = np.sum(model.predict(np.array(range(len(daily_sales), len(daily_sales) + 30)).reshape(-1, 1)))
-#             method = "Linear Trend"
-#         else:
-#             m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False, uncertainty_samples=0)
-#             m.fit(daily_sales.rename(columns={'date': 'ds', 'revenue': 'y'}))
-#             forecast = m.predict(m.make_future_dataframe(periods=30))
-#             total_predicted = forecast.iloc[-30:]['yhat'].sum()
-#             method = "Prophet Seasonal Model"
-#         unique_products = df['product'].unique()
-#         product_results = []
-#         total_hist_revenue = df['revenue'].sum()
-#         for prod in unique_products:
-#             prod_df = df[df['product'] == prod]
-#             revenue_share = prod_df['revenue'].sum() / total_hist_revenue if total_hist_revenue > 0 else 0
-#             expected_prod_rev = total_predicted * revenue_share
-#             avg_price = (prod_df['revenue'] / prod_df['quantity']).mean()
-#             predicted_qty = expected_prod_rev / avg_price if avg_price > 0 else 0
-#             status = "Healthy"
-#             if predicted_qty > 100: status = "Stock Warning"
-#             product_results.append({
-#                 "product": prod,
-#                 "predicted_qty": round(float(predicted_qty), 0),
-#                 "expected_revenue": round(float(expected_prod_rev), 2),
-#                 "status": status
-#             })
-#         return {
-#             "forecast_30d_total": f"₹{max(0, total_predicted):,.2f}",
-#             "methodology": method,
-#             "top_buy_list": sorted(product_results, key=lambda x: x['predicted_qty'], reverse=True)[:10],
-#             "abc_analysis": get_abc_analysis(df)
-#         }
-#     except Exception as e:
-#         return {"error": str(e)}
-#
-# def historical_summary(df: pd.DataFrame):
-#     total_revenue = df["revenue"].sum()
-#     total_orders = len(df)
-#     return {"total_revenue": float(total_revenue), "total_orders": total_orders}
-#
-# def best_selling_product(df: pd.DataFrame):
-#     product = df.groupby("product")["quantity"].sum().idxmax()
-#     return {"top_product": product}
-# def get_eoq_data(df: pd.DataFrame):
-#     results = []
-#     # Ordering Cost (S) and Holding Cost (H) are industry constants
-#     S = 500  # Fixed cost per order (shipping/admin)
-#     H_rate = 0.15  # 15% of product price per year to store it
-#
-#     products = df.groupby('product').agg({
-#         'quantity': 'sum',
-#         'revenue': 'mean' # Used to estimate unit price
-#     }).reset_index()
-#
-#     total_days = (pd.to_datetime(df['date']).max() - pd.to_datetime(df['date']).min()).days or 1
-#
-#     for _, row in products.iterrows():
-#         annual_demand = (row['quantity'] / total_days) * 365
-#         unit_price = row['revenue']
-#         holding_cost = unit_price * H_rate
-#
-#         # Economic Order Quantity Formula: sqrt(2DS/H)
-#         eoq = math.sqrt((2 * annual_demand * S) / max(holding_cost, 1))
-#
-#         # Reorder Point (Safety logic)
-#         lead_time = 7 # 7 days to get stock
-#         daily_usage = annual_demand / 365
-#         reorder_point = daily_usage * lead_time * 1.2 # 20% safety buffer
-#
-#         results.append({
-#             "product": row['product'],
-#             "recommended_order_size": round(eoq, 0),
-#             "reorder_at_stock_level": round(reorder_point, 0)
-#         })
-#     return results
-#
-# def next_month_prediction(df: pd.DataFrame):
-#     # ... (Keep your existing Prophet code from the last step)
-#     # At the end of the return dictionary, add the EOQ data
-#     forecast_results = {
-#         "forecast_30d_total": f"₹{max(0, total_predicted):,.2f}",
-#         "methodology": method,
-#         "top_buy_list": sorted(product_results, key=lambda x: x['predicted_qty'], reverse=True)[:10],
-#         "abc_analysis": get_abc_analysis(df),
-#         "inventory_optimization": get_eoq_data(df) # NEW
-#     }
-#     return forecast_results
+import os
 import pandas as pd
 import numpy as np
 import math
-from prophet import Prophet
-from sklearn.linear_model import LinearRegression
+import hashlib
+import threading
+from collections import OrderedDict
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+# Aggregate revenue model: "holt_winters" (default) or "prophet".
+# Prophet pulls in the Stan runtime, so it is only imported when explicitly enabled.
+FORECAST_MODEL = os.getenv("FORECAST_MODEL", "holt_winters").lower()
+
+# Seasonal fits are reused across requests for identical daily series (LRU, per process)
+FORECAST_CACHE_SIZE = 32
+_forecast_cache: "OrderedDict[bytes, float]" = OrderedDict()
+_forecast_cache_lock = threading.Lock()
+
+def _series_fingerprint(series_df: pd.DataFrame) -> bytes:
+    hashed = pd.util.hash_pandas_object(series_df, index=True).values
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).digest()
+
+def _holt_winters_30d_total(daily_sales: pd.DataFrame) -> float:
+    # Days without orders are real zero-revenue days for the smoothing model
+    series = daily_sales.set_index('date')['revenue'].asfreq('D', fill_value=0)
+    weekly = len(series) >= 14  # needs two full weekly cycles to estimate seasonality
+    model = ExponentialSmoothing(
+        series.to_numpy(dtype=float),
+        trend='add',
+        seasonal='add' if weekly else None,
+        seasonal_periods=7 if weekly else None,
+        initialization_method='estimated'
+    )
+    return float(model.fit(optimized=True, use_brute=False).forecast(30).sum())
+
+def _prophet_30d_total(daily_sales: pd.DataFrame) -> float:
+    from prophet import Prophet
+    m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False, uncertainty_samples=0)
+    m.fit(daily_sales.rename(columns={'date': 'ds', 'revenue': 'y'}))
+    forecast = m.predict(m.make_future_dataframe(periods=30))
+    return float(forecast.iloc[-30:]['yhat'].sum())
+
+def warm_up_forecast_model():
+    # Pay Prophet's import and first Stan fit at startup rather than on the first chat request
+    if FORECAST_MODEL == "prophet":
+        _prophet_30d_total(pd.DataFrame({'date': pd.date_range('2020-01-01', periods=14), 'revenue': np.arange(14, dtype=float)}))
+
+def seasonal_30d_total(daily_sales: pd.DataFrame) -> float:
+    """
+    Returns the 30-day seasonal revenue forecast for `daily_sales` (columns: date, revenue),
+    serving repeat requests for the same series from an in-process LRU cache.
+    """
+    key = _series_fingerprint(daily_sales)
+    with _forecast_cache_lock:
+        if key in _forecast_cache:
+            _forecast_cache.move_to_end(key)
+            return _forecast_cache[key]
+
+    if FORECAST_MODEL == "prophet":
+        total = _prophet_30d_total(daily_sales)
+    else:
+        total = _holt_winters_30d_total(daily_sales)
+
+    with _forecast_cache_lock:
+        _forecast_cache[key] = total
+        if len(_forecast_cache) > FORECAST_CACHE_SIZE:
+            _forecast_cache.popitem(last=False)
+    return total
 
 def get_abc_analysis(df: pd.DataFrame):
-    items = df.groupby('product')['revenue'].sum().sort_values(ascending=False).reset_index()
+    items = df.groupby('product', observed=True)['revenue'].sum().sort_values(ascending=False).reset_index()
     total_rev = items['revenue'].sum()
     items['running_sum'] = items['revenue'].cumsum()
     abc_results = []
@@ -420,11 +87,11 @@ def get_eoq_data(df: pd.DataFrame):
     S = 500  # Fixed Ordering Cost
     H_rate = 0.15  # Holding Cost Rate (15%)
 
-    # Group by product to get demand and average revenue
-    products = df.groupby('product').agg({
-        'quantity': 'sum',
-        'revenue': 'mean'
-    }).reset_index()
+    # One groupby pass for demand and mean unit price (revenue/quantity) per product
+    products = df.assign(unit_price=df['revenue'] / df['quantity']).groupby('product', observed=True).agg(
+        quantity=('quantity', 'sum'),
+        avg_unit_price=('unit_price', 'mean')
+    ).reset_index()
 
     # Calculate total days in the dataset to annualize demand
     df['date'] = pd.to_datetime(df['date'])
@@ -432,10 +99,7 @@ def get_eoq_data(df: pd.DataFrame):
 
     for _, row in products.iterrows():
         annual_demand = (row['quantity'] / total_days) * 365
-        # Estimate unit price based on mean revenue/quantity for that product
-        prod_samples = df[df['product'] == row['product']]
-        avg_unit_price = (prod_samples['revenue'] / prod_samples['quantity']).mean()
-        holding_cost = max(avg_unit_price * H_rate, 1)
+        holding_cost = max(row['avg_unit_price'] * H_rate, 1)
 
         # EOQ = sqrt(2DS/H)
         eoq = math.sqrt((2 * annual_demand * S) / holding_cost)
@@ -455,46 +119,63 @@ def get_seasonal_trends(df: pd.DataFrame):
     month_order = ["January", "February", "March", "April", "May", "June",
                    "July", "August", "September", "October", "November", "December"]
 
-    monthly_prod_sales = df.groupby(['month_name', 'product'])['quantity'].sum().reset_index()
-    available_months = [m for m in month_order if m in monthly_prod_sales['month_name'].unique()]
+    # Quantity and revenue per (month, product) in a single pass; no per-product re-masking of df
+    monthly_prod_sales = df.groupby(['month_name', 'product'], observed=True)[['quantity', 'revenue']].sum()
+    available_months = [m for m in month_order if m in monthly_prod_sales.index.get_level_values('month_name')]
 
     seasonal_report = []
     for month in available_months:
-        month_data = monthly_prod_sales[monthly_prod_sales['month_name'] == month]
-        top_3 = month_data.nlargest(3, 'quantity')
-        products_list = [{"name": r['product'],
-                          "revenue": float(df[(df['month_name']==month) & (df['product']==r['product'])]['revenue'].sum()),
-                          "quantity": int(r['quantity'])} for _, r in top_3.iterrows()]
+        top_3 = monthly_prod_sales.loc[month].nlargest(3, 'quantity')
+        products_list = [{"name": product,
+                          "revenue": float(r['revenue']),
+                          "quantity": int(r['quantity'])} for product, r in top_3.iterrows()]
         seasonal_report.append({"month": month, "top_products": products_list})
 
     best_month = df.groupby('month_name')['revenue'].sum().idxmax()
     return {"most_promising_month": best_month, "monthly_breakdown": seasonal_report}
 
+def _product_codes(df: pd.DataFrame):
+    """
+    Returns (codes, products) for the product column, sorted by product name.
+    Uploads from load_csv already carry a sorted categorical, so this reuses its codes
+    instead of hashing the names again; other frames are factorized here.
+    """
+    if isinstance(df['product'].dtype, pd.CategoricalDtype):
+        return df['product'].cat.codes.to_numpy(), df['product'].cat.categories
+    return pd.factorize(df['product'], sort=True)
+
+def predict_next_n_days(values: np.ndarray, n: int) -> np.ndarray:
+    # Closed-form least-squares line over a 0..len-1 time index, extrapolated n steps ahead
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return np.full(n, values[0] if len(values) else 0.0)
+    slope, intercept = np.polyfit(np.arange(len(values)), values, 1)
+    return intercept + slope * np.arange(len(values), len(values) + n)
+
 def next_month_prediction(df: pd.DataFrame):
     df['date'] = pd.to_datetime(df['date'])
     daily_sales = df.groupby('date')['revenue'].sum().reset_index()
 
     if len(daily_sales) < 10:
-        X = np.array(range(len(daily_sales))).reshape(-1, 1)
-        model = LinearRegression().fit(X, daily_sales['revenue'].values)
-        total_predicted = np.sum(model.predict(np.array(range(len(daily_sales), len(daily_sales) + 30)).reshape(-1, 1)))
+        total_predicted = float(predict_next_n_days(daily_sales['revenue'].to_numpy(), 30).sum())
         method = "Linear Trend"
     else:
-        m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False, uncertainty_samples=0)
-        m.fit(daily_sales.rename(columns={'date': 'ds', 'revenue': 'y'}))
-        forecast = m.predict(m.make_future_dataframe(periods=30))
-        total_predicted = forecast.iloc[-30:]['yhat'].sum()
-        method = "Prophet Seasonal Model"
-
-    product_results = []
-    total_hist_rev = df['revenue'].sum()
-    for prod in df['product'].unique():
-        prod_df = df[df['product'] == prod]
-        share = prod_df['revenue'].sum() / total_hist_rev if total_hist_rev > 0 else 0
-        pred_rev = total_predicted * share
-        avg_price = (prod_df['revenue'] / prod_df['quantity']).mean()
-        pred_qty = pred_rev / avg_price if avg_price > 0 else 0
-        product_results.append({"product": prod, "predicted_qty": round(float(pred_qty), 0), "expected_revenue": round(float(pred_rev), 2)})
+        total_predicted = seasonal_30d_total(daily_sales)
+        method = "Prophet Seasonal Model" if FORECAST_MODEL == "prophet" else "Holt-Winters Seasonal Model"
+
+    # Split the forecast total across products by historical revenue share, with each
+    # product's revenue and average unit price from one groupby instead of a filter per product
+    per_product = df.assign(price=df['revenue'] / df['quantity']).groupby('product', observed=True, sort=False).agg(
+        revenue=('revenue', 'sum'), avg_price=('price', 'mean')
+    )
+    total_hist_rev = per_product['revenue'].sum()
+    share = per_product['revenue'] / total_hist_rev if total_hist_rev > 0 else pd.Series(0.0, index=per_product.index)
+    pred_rev = total_predicted * share
+    pred_qty = (pred_rev / per_product['avg_price'].where(per_product['avg_price'] > 0)).fillna(0)
+    product_results = [
+        {"product": prod, "predicted_qty": round(float(qty), 0), "expected_revenue": round(float(rev), 2)}
+        for prod, qty, rev in zip(per_product.index, pred_qty.tolist(), pred_rev.tolist())
+    ]
 
     return {
         "forecast_30d_total": f"₹{max(0, total_predicted):,.2f}",
@@ -508,5 +189,31 @@ def next_month_prediction(df: pd.DataFrame):
 def historical_summary(df: pd.DataFrame):
     return {"total_revenue": float(df["revenue"].sum()), "total_orders": len(df)}
 
+def _product_totals(df: pd.DataFrame, values: np.ndarray):
+    # Per-product sums straight off the column arrays: one bincount over the product codes, no groupby
+    codes, products = _product_codes(df)
+    valid = codes >= 0
+    return products, np.bincount(codes[valid], weights=values[valid], minlength=len(products))
+
 def best_selling_product(df: pd.DataFrame):
-    return {"top_product": df.groupby("product")["quantity"].sum().idxmax()}
\ No newline at end of file
+    products, totals = _product_totals(df, df['quantity'].to_numpy(dtype=float))
+    return {"top_product": products[int(totals.argmax())]}
+
+def analyze_profitability(df: pd.DataFrame):
+    if not {"cost_price", "revenue", "quantity"}.issubset(df.columns):
+        return "I need 'cost_price', 'revenue', and 'quantity' columns to calculate profit."
+
+    # Per-row profit as a plain array, never materialized as a column
+    profit = df['revenue'].to_numpy(dtype=float) - df['cost_price'].to_numpy(dtype=float) * df['quantity'].to_numpy(dtype=float)
+    products, totals = _product_totals(df, profit)
+    if len(totals) == 0:
+        return "No sales data available."
+
+    best = int(totals.argmax())
+    top = np.argsort(-totals, kind="stable")[:10]
+    return {
+        "best_profitable_product": products[best],
+        "total_profit_earned": f"₹{totals[best]:,.2f}",
+        "top_buy_list": [{"product": products[i], "profit": float(totals[i])} for i in top],
+        "message": f"The {products[best]} is your most profitable item."
+    }
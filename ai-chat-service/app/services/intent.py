@@ -1,15 +1,17 @@
+# (keywords, intent) in priority order: the first rule with a keyword in the question wins
+INTENT_RULES = [
+    (("profit", "margin"), "PROFITABILITY"),
+    (("abc", "importance", "category"), "ABC_ANALYSIS"),
+    (("seasonal", "pattern", "month"), "SEASONAL"),
+    (("trend", "highest", "best"), "BEST_PRODUCT"),
+    (("forecast", "predict", "next"), "FORECAST"),
+    (("history", "past", "total"), "HISTORICAL"),
+    (("how much", "order", "stock", "inventory", "optimize"), "INVENTORY_OPTIMIZATION"),
+]
+
 def detect_intent(question: str) -> str:
     q = question.lower()
-    if "abc" in q or "importance" in q or "category" in q:
-        return "ABC_ANALYSIS"
-    if "seasonal" in q or "pattern" in q or "month" in q:
-        return "SEASONAL"
-    if "trend" in q or "highest" in q or "best" in q:
-        return "BEST_PRODUCT"
-    if "forecast" in q or "predict" in q or "next" in q:
-        return "FORECAST"
-    if "history" in q or "past" in q or "total" in q:
-        return "HISTORICAL"
-    if "how much" in q or "order" in q or "stock" in q or "inventory" in q or "optimize" in q:
-        return "INVENTORY_OPTIMIZATION"
-    return "UNKNOWN"
\ No newline at end of file
+    for keywords, intent in INTENT_RULES:
+        if any(kw in q for kw in keywords):
+            return intent
+    return "UNKNOWN"
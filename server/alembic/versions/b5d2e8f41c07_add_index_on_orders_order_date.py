@@ -0,0 +1,28 @@
+"""Add index on orders.order_date
+
+Revision ID: b5d2e8f41c07
+Revises: 7a9339458285
+Create Date: 2026-10-15 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2e8f41c07'
+down_revision: Union[str, Sequence[str], None] = '7a9339458285'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_orders_order_date'), 'orders', ['order_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_orders_order_date'), table_name='orders')
@@ -0,0 +1,44 @@
+"""Add composite and partial indexes on orders
+
+Revision ID: c3f9a7d2e614
+Revises: b5d2e8f41c07
+Create Date: 2026-10-15 14:32:08.517942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a7d2e614'
+down_revision: Union[str, Sequence[str], None] = 'b5d2e8f41c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (customer_email, order_date DESC) replaces the single-column customer_email index
+    op.drop_index(op.f('ix_orders_customer_email'), table_name='orders', if_exists=True)
+    op.create_index('ix_orders_email_date', 'orders', ['customer_email', sa.text('order_date DESC')], unique=False)
+    op.create_index(
+        'ix_orders_open_status', 'orders', ['status'], unique=False,
+        postgresql_where=sa.text("status IN ('Pending', 'Processing', 'Shipped', 'In_Transit')")
+    )
+    # Rebuild the tracking_id index as a partial one over orders that have a tracking id
+    op.drop_index(op.f('ix_orders_tracking_id'), table_name='orders', if_exists=True)
+    op.create_index(
+        'ix_orders_tracking_id', 'orders', ['tracking_id'], unique=False,
+        postgresql_where=sa.text('tracking_id IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_tracking_id', table_name='orders')
+    op.create_index(op.f('ix_orders_tracking_id'), 'orders', ['tracking_id'], unique=False)
+    op.drop_index('ix_orders_open_status', table_name='orders')
+    op.drop_index('ix_orders_email_date', table_name='orders')
+    op.create_index(op.f('ix_orders_customer_email'), 'orders', ['customer_email'], unique=False)
@@ -0,0 +1,39 @@
+"""Add stored stock_status column to products
+
+Revision ID: d8e4b1c7a592
+Revises: c3f9a7d2e614
+Create Date: 2026-10-15 15:05:47.203118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e4b1c7a592'
+down_revision: Union[str, Sequence[str], None] = 'c3f9a7d2e614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column(
+        'stock_status',
+        sa.String(),
+        sa.Computed(
+            "CASE WHEN stock_quantity <= 0 THEN 'Out of Stock' "
+            "WHEN stock_quantity <= reorder_level THEN 'Low Stock' ELSE 'In Stock' END",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index(op.f('ix_products_stock_status'), 'products', ['stock_status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_stock_status'), table_name='products')
+    op.drop_column('products', 'stock_status')
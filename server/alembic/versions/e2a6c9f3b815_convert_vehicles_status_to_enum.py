@@ -0,0 +1,66 @@
+"""Convert vehicles.status to a vehiclestatus enum with a covering index
+
+Revision ID: e2a6c9f3b815
+Revises: d8e4b1c7a592
+Create Date: 2026-10-15 15:48:19.664027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a6c9f3b815'
+down_revision: Union[str, Sequence[str], None] = 'd8e4b1c7a592'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+vehiclestatus = postgresql.ENUM('Idle', 'On_Route', 'In_Shop', name='vehiclestatus')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # Refuse to guess a status for values the enum does not know; fix those rows first
+    unknown_statuses = bind.execute(sa.text(
+        "SELECT DISTINCT status FROM vehicles WHERE status NOT IN ('Idle', 'On Route', 'In-Shop')"
+    )).scalars().all()
+    if unknown_statuses:
+        raise RuntimeError(
+            "vehicles.status has values outside 'Idle', 'On Route', 'In-Shop': "
+            f"{', '.join(map(repr, unknown_statuses))}. Update those rows, then rerun the upgrade."
+        )
+
+    vehiclestatus.create(bind, checkfirst=True)
+    # Like the other enum columns, the type stores member names; map the stored values onto them
+    op.alter_column(
+        'vehicles', 'status',
+        existing_type=sa.String(),
+        type_=vehiclestatus,
+        postgresql_using=(
+            "(CASE status WHEN 'Idle' THEN 'Idle' WHEN 'On Route' THEN 'On_Route' "
+            "WHEN 'In-Shop' THEN 'In_Shop' END)::vehiclestatus"
+        ),
+    )
+    op.create_index(
+        'ix_vehicles_status_cov', 'vehicles', ['status'], unique=False,
+        postgresql_include=['latitude', 'longitude', 'live_temp']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vehicles_status_cov', table_name='vehicles')
+    op.alter_column(
+        'vehicles', 'status',
+        existing_type=vehiclestatus,
+        type_=sa.String(),
+        postgresql_using=(
+            "CASE status WHEN 'On_Route' THEN 'On Route' WHEN 'In_Shop' THEN 'In-Shop' "
+            "ELSE status::text END"
+        ),
+    )
+    vehiclestatus.drop(op.get_bind(), checkfirst=True)
@@ -1,11 +1,20 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
-from groq import Groq
+from groq import AsyncGroq
 
 from ..config import settings  # Import app settings (for API keys)
 
 router = APIRouter()
 
+# One client per process so its connection pool (and TLS sessions) is reused across requests
+_groq_client: AsyncGroq | None = None
+
+def _client() -> AsyncGroq:
+    global _groq_client
+    if _groq_client is None:
+        _groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+    return _groq_client
+
 # Defines the expected request body structure from the frontend
 class DescriptionRequest(BaseModel):
     product_name: str
@@ -24,9 +33,6 @@ async def generate_ai_description(request: DescriptionRequest):
         )
 
     try:
-        # Initialize the Groq client
-        client = Groq(api_key=settings.GROQ_API_KEY)
-        
         # Construct the prompt for the AI model
         prompt = (
             f"Generate a compelling and concise e-commerce product description in about 30-50 words "
@@ -37,8 +43,8 @@ async def generate_ai_description(request: DescriptionRequest):
         
         prompt += ". Highlight its key features and benefits for the customer. Do not use hashtags."
 
-        # Call the Groq Chat Completions API
-        chat_completion = client.chat.completions.create(
+        # Call the Groq Chat Completions API without blocking the event loop
+        chat_completion = await _client().chat.completions.create(
             messages=[
                 {
                     "role": "user",
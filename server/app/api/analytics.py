@@ -1,16 +1,19 @@
 # server/app/api/analytics.py
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 # Import SQLAlchemy functions, date casting, and month extraction
-from sqlalchemy import func, case, Date, cast, extract
-from pydantic import BaseModel
+from sqlalchemy import func, case, Date, cast, extract, text
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict
 from ..database import get_db
 from ..schemas import schemas
 from ..models import models
 import random
-from datetime import datetime, timedelta, date
+import pandas as pd
+import orjson
+from datetime import datetime, timedelta, date, time
 from calendar import month_abbr # For getting month abbreviations (e.g., "Jan")
 
 # Import helper function to get dynamic settings
@@ -37,8 +40,7 @@ class LowStockProduct(BaseModel):
     name: str
     stock_quantity: int
     
-    class Config:
-        from_attributes = True # for Pydantic v2
+    model_config = ConfigDict(from_attributes=True)
 
 class LowStockProductResponse(BaseModel):
     data: List[LowStockProduct]
@@ -61,25 +63,28 @@ def get_analytics_summary(db: Session = Depends(get_db)):
     # 1. Get the dynamic low stock threshold from settings
     low_stock_threshold = get_low_stock_threshold(db)
 
-    # 2. KPI Cards Data
-    total_orders = db.query(func.count(models.Order.id)).scalar() or 0
-    total_revenue = db.query(func.sum(models.Order.total_amount)).scalar() or 0.0
-    pending_orders = db.query(func.count(models.Order.id)).filter(models.Order.status == schemas.OrderStatus.Pending).scalar() or 0
-    delivered_orders = db.query(func.count(models.Order.id)).filter(models.Order.status == schemas.OrderStatus.Delivered).scalar() or 0
-    
-    # 3. Use the dynamic threshold for low_stock_items_count
-    low_stock_items_count = db.query(func.count(models.Product.id)).filter(
-        models.Product.stock_quantity <= low_stock_threshold, # Use dynamic threshold
-        models.Product.stock_quantity > 0
-    ).scalar() or 0
-    # --- END OF UPDATED LOGIC ---
-
-    # Calculate Total Inventory Value
-    total_inventory_value = db.query(
+    # 2. KPI Cards Data: one scan of orders with conditional counts instead of a query per KPI
+    delayed_statuses = [ 
+        schemas.OrderStatus.Pending, schemas.OrderStatus.Processing,
+        schemas.OrderStatus.Shipped, schemas.OrderStatus.In_Transit,
+    ]
+    total_orders, total_revenue, pending_orders, delivered_orders, delayed_count = db.query(
+        func.count(models.Order.id),
+        func.sum(models.Order.total_amount),
+        func.count(case((models.Order.status == schemas.OrderStatus.Pending, 1))),
+        func.count(case((models.Order.status == schemas.OrderStatus.Delivered, 1))),
+        func.count(case((models.Order.status.in_(delayed_statuses), 1)))
+    ).one()
+    total_revenue = total_revenue or 0.0
+
+    # 3. Low stock count (dynamic threshold) and Total Inventory Value from one scan of in-stock products
+    low_stock_items_count, total_inventory_value = db.query(
+        func.count(case((models.Product.stock_quantity <= low_stock_threshold, 1))),
         func.sum(models.Product.stock_quantity * func.coalesce(models.Product.cost_price, 0.0))
     ).filter(
         models.Product.stock_quantity > 0 
-    ).scalar() or 0.0
+    ).one()
+    total_inventory_value = total_inventory_value or 0.0
 
     # Format KPI cards for the response
     kpi_cards = [
@@ -102,13 +107,6 @@ def get_analytics_summary(db: Session = Depends(get_db)):
     top_selling_products = [{"name": name, "value": qty} for name, qty in top_products_query]
 
     # 5. Delivery Status
-    delayed_statuses = [ 
-        schemas.OrderStatus.Pending, schemas.OrderStatus.Processing,
-        schemas.OrderStatus.Shipped, schemas.OrderStatus.In_Transit,
-    ]
-    delayed_count = db.query(func.count(models.Order.id)).filter(
-        models.Order.status.in_(delayed_statuses)
-        ).scalar() or 0
     delivery_status = {"on_time": delivered_orders, "delayed": delayed_count}
 
     # 6. Order Status Breakdown
@@ -170,30 +168,32 @@ def get_revenue_over_time(
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=days - 1) # Inclusive date range
 
-    # Query the database, grouping by the casted order date
-    revenue_query = db.query(
-            cast(models.Order.order_date, Date).label("order_day"),
+    # Aggregate per day, then LEFT JOIN onto a generated calendar so Postgres returns the zero-padded range.
+    # Filter on the raw timestamp (half-open range) so the order_date index can be used.
+    order_day = cast(models.Order.order_date, Date)
+    daily_revenue = db.query(
+            order_day.label("order_day"),
             func.sum(models.Order.total_amount).label("daily_revenue")
         ).filter(
-            cast(models.Order.order_date, Date) >= start_date,
-            cast(models.Order.order_date, Date) <= end_date
+            models.Order.order_date >= datetime.combine(start_date, time.min),
+            models.Order.order_date < datetime.combine(end_date + timedelta(days=1), time.min)
         ).group_by(
-            cast(models.Order.order_date, Date)
-        ).order_by(
-            cast(models.Order.order_date, Date)
-        ).all()
+            order_day
+        ).subquery()
 
-    # Create a map of all days in the range, initialized to 0.0 revenue
-    date_range = [start_date + timedelta(days=i) for i in range(days)]
-    revenue_map = {day: 0.0 for day in date_range}
+    calendar = func.generate_series(start_date, end_date, text("interval '1 day'")).table_valued("day").render_derived()
+    calendar_day = cast(calendar.c.day, Date)
 
-    # Fill the map with actual revenue data from the query
-    for day, daily_revenue in revenue_query:
-        if day in revenue_map:
-            revenue_map[day] = daily_revenue if daily_revenue is not None else 0.0
+    revenue_query = db.query(
+            calendar_day.label("day"),
+            func.coalesce(daily_revenue.c.daily_revenue, 0.0).label("revenue")
+        ).select_from(calendar).outerjoin(
+            daily_revenue, daily_revenue.c.order_day == calendar_day
+        ).order_by(
+            calendar_day
+        ).all()
 
-    # Convert the map to the list format required by the response model
-    revenue_data = [{"date": day, "revenue": revenue} for day, revenue in revenue_map.items()]
+    revenue_data = [{"date": row.day, "revenue": row.revenue} for row in revenue_query]
 
     return {"data": revenue_data}
 
@@ -210,24 +210,19 @@ def export_raw_sales(db: Session = Depends(get_db)):
         models.Product.name.label("product"),
         models.OrderItem.quantity,
         # Correctly calculating revenue: Quantity * Product Selling Price
-        (models.OrderItem.quantity * models.Product.selling_price).label("revenue"),
-        models.Product.cost_price
+        func.coalesce(models.OrderItem.quantity * models.Product.selling_price, 0.0).label("revenue"),
+        func.coalesce(models.Product.cost_price, 0.0).label("cost_price")
     ).join(
         models.OrderItem, models.OrderItem.order_id == models.Order.id
     ).join(
         models.Product, models.Product.id == models.OrderItem.product_id
-    ).all()
+    )
 
-    return [
-        {
-            "date": item.date.strftime("%Y-%m-%d"),
-            "product": item.product,
-            "quantity": item.quantity,
-            "revenue": float(item.revenue) if item.revenue else 0.0,
-            "cost_price": float(item.cost_price) if item.cost_price else 0.0
-        }
-        for item in raw_data_query
-    ]
+    # Load the result set column-wise and convert it in bulk instead of building each dict in Python
+    df = pd.read_sql(raw_data_query.statement, db.connection())
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    # No response_model here, so skip jsonable_encoder's per-value walk and dump the records with orjson
+    return Response(orjson.dumps(df.to_dict(orient="records")), media_type="application/json")
 @router.get("/monthly-revenue", response_model=MonthlyRevenueResponse)
 def get_monthly_revenue(
     months: int = 6, # Default to last 6 months
@@ -240,44 +235,33 @@ def get_monthly_revenue(
     for _ in range(months - 1):
         start_month_date = (start_month_date - timedelta(days=1)).replace(day=1)
 
-    revenue_query = db.query(
-            extract('year', models.Order.order_date).label("order_year"),
-            extract('month', models.Order.order_date).label("order_month"),
+    # Same calendar LEFT JOIN as /revenue-over-time, stepping by month
+    order_month = cast(func.date_trunc('month', models.Order.order_date), Date)
+    monthly_revenue = db.query(
+            order_month.label("order_month"),
             func.sum(models.Order.total_amount).label("monthly_revenue")
         ).filter(
             models.Order.order_date >= start_month_date
         ).group_by(
-            extract('year', models.Order.order_date),
-            extract('month', models.Order.order_date)
+            order_month
+        ).subquery()
+
+    calendar = func.generate_series(start_month_date, today.replace(day=1), text("interval '1 month'")).table_valued("month").render_derived()
+    calendar_month = cast(calendar.c.month, Date)
+
+    revenue_query = db.query(
+            calendar_month.label("month"),
+            func.coalesce(monthly_revenue.c.monthly_revenue, 0.0).label("revenue")
+        ).select_from(calendar).outerjoin(
+            monthly_revenue, monthly_revenue.c.order_month == calendar_month
         ).order_by(
-            extract('year', models.Order.order_date),
-            extract('month', models.Order.order_date)
+            calendar_month
         ).all()
 
-    # Create a map of all months in the range, initialized to 0.0 revenue
-    revenue_map: Dict[str, float] = {}
-    current_date = start_month_date
-    end_date = today
-    
-    while current_date <= end_date:
-        month_key = current_date.strftime("%Y-%m")
-        revenue_map[month_key] = 0.0
-        # Move to the first day of the next month
-        last_day = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-        current_date = last_day + timedelta(days=1)
-
-    # Fill the map with actual revenue data from the query
-    for year, month, monthly_revenue in revenue_query:
-        month_key = f"{int(year)}-{int(month):02d}"
-        if month_key in revenue_map:
-            revenue_map[month_key] = monthly_revenue if monthly_revenue is not None else 0.0
-
-    # Convert the map to the list format, using month abbreviations
-    monthly_data = []
-    for month_key in sorted(revenue_map.keys()):
-        year, month_num = map(int, month_key.split('-'))
-        month_abbr_name = month_abbr[month_num] # Get "Jan", "Feb", etc.
-        monthly_data.append({"month": month_abbr_name, "revenue": revenue_map[month_key]})
+    monthly_data = [
+        {"month": month_abbr[row.month.month], "revenue": row.revenue} # "Jan", "Feb", etc.
+        for row in revenue_query
+    ]
 
     return {"data": monthly_data}
 
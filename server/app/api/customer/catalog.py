@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, selectinload, with_expression
 from typing import List
 
 from ...database import get_db
 from ...models import models
 from ...schemas import schemas
-from ...schemas.schemas import StockStatus  # import enum
 
 router = APIRouter()
 
@@ -13,24 +12,16 @@ router = APIRouter()
 @router.get("/products", response_model=List[schemas.Product])
 def get_storefront_products(db: Session = Depends(get_db)):
 
+    # The storefront marks a product Low Stock against its own reorder level (no level -> In Stock),
+    # which the database keeps in the stored stock_status column
     products = (
         db.query(models.Product)
-        .options(joinedload(models.Product.images))
+        .options(
+            selectinload(models.Product.images),
+            with_expression(models.Product.status, models.Product.stock_status)
+        )
         .filter(models.Product.stock_quantity > 0)
         .all()
     )
 
-
-    result = []
-    for product in products:
-        if product.stock_quantity <= 0:
-            status = StockStatus.Out_of_Stock
-        elif product.reorder_level and product.stock_quantity <= product.reorder_level:
-            status = StockStatus.Low_Stock
-        else:
-            status = StockStatus.In_Stock
-
-        product.status = status  # 👈 attach dynamically
-        result.append(product)
-
-    return result
+    return products
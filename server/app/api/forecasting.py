@@ -2,9 +2,8 @@ import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, cast, Date
-from sklearn.linear_model import LinearRegression  # ML model for forecasting
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 from typing import Optional  # For the optional product_id parameter
 
 from ..database import get_db
@@ -27,20 +26,21 @@ def get_demand_forecast(
     # 1. Fetch historical data (last 90 days) from the database
     ninety_days_ago = datetime.utcnow().date() - timedelta(days=90)
 
-    # Base query for order item quantities
+    # Base query for order item quantities; the raw timestamp filter keeps the order_date index usable
+    order_day = cast(models.Order.order_date, Date)
     query = db.query(
-        cast(models.Order.order_date, Date).label("date"),
+        order_day.label("date"),
         func.sum(models.OrderItem.quantity).label("total_quantity")
     ).join(models.OrderItem, models.OrderItem.order_id == models.Order.id) \
-        .filter(cast(models.Order.order_date, Date) >= ninety_days_ago)
+        .filter(models.Order.order_date >= datetime.combine(ninety_days_ago, time.min))
 
     # If a product_id is provided, filter the query for that specific product
     if product_id:
         query = query.filter(models.OrderItem.product_id == product_id)
 
     # Finalize the query: group by date and order
-    order_data_query = query.group_by(cast(models.Order.order_date, Date)) \
-        .order_by(cast(models.Order.order_date, Date)) \
+    order_data_query = query.group_by(order_day) \
+        .order_by(order_day) \
         .all()
 
     if not order_data_query:
@@ -58,19 +58,15 @@ def get_demand_forecast(
     # Create a 'time_index' (days since start) as the feature for the model
     df['time_index'] = (df['date'] - df['date'].min()).dt.days
 
-    # 3. Train a simple Linear Regression model
-    X = df[['time_index']]  # Features (input)
-    y = df['total_quantity']  # Target (output)
-
-    model = LinearRegression()
-    model.fit(X, y)
+    # 3. Fit a simple linear trend (closed-form least squares)
+    slope, intercept = np.polyfit(df['time_index'].to_numpy(dtype=float), df['total_quantity'].to_numpy(dtype=float), 1)
 
     # 4. Predict the next 30 days
     last_time_index = df['time_index'].max()
     # Create an array of future time indices (next 30 days)
-    future_time_index = np.array(range(last_time_index + 1, last_time_index + 31)).reshape(-1, 1)
+    future_time_index = np.arange(last_time_index + 1, last_time_index + 31)
 
-    predicted_quantities = model.predict(future_time_index)
+    predicted_quantities = intercept + slope * future_time_index
 
     today = datetime.utcnow().date()
     forecast_data = []
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, with_expression
 from typing import List
 from ..database import get_db
 from ..schemas import schemas
 from ..models import models
+from ..utils.streaming import stream_json_array
 # Import helpers to dynamically calculate product status based on settings
-from ..utils.settings_helpers import get_low_stock_threshold, get_product_status
+from ..utils.settings_helpers import get_low_stock_threshold, get_product_status, product_status_expression
 
 router = APIRouter()
 
@@ -17,23 +20,14 @@ def get_all_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_
     # Get the current low stock threshold from the database settings
     low_stock_threshold = get_low_stock_threshold(db)
 
-    # Fetch products and eager-load their images to prevent N+1 query problems
-    products_from_db = db.query(models.Product).options(
-        joinedload(models.Product.images)
-    ).order_by(models.Product.name).offset(skip).limit(limit).all()
+    # Fetch products and eager-load their images (one extra IN query per batch) to prevent N+1 query problems.
+    # The status is computed by the database from stock and threshold (not stored).
+    stmt = select(models.Product).options(
+        selectinload(models.Product.images),
+        with_expression(models.Product.status, product_status_expression(low_stock_threshold))
+    ).order_by(models.Product.name).offset(skip).limit(limit)
 
-    # List to hold products with their status calculated
-    products_with_status = []
-    for product in products_from_db:
-        # Calculate status dynamically based on stock and threshold
-        calculated_status = get_product_status(product.stock_quantity, low_stock_threshold)
-
-        # Set the calculated status on the object for the response
-        # This does NOT save to the database, it's only for the Pydantic model
-        product.status = calculated_status
-        products_with_status.append(product)
-
-    return products_with_status
+    return stream_json_array(stmt, schemas.Product)
 
 @router.post("/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
@@ -41,14 +35,6 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     Creates a new product in the database.
     The 'status' field is dynamically calculated upon creation.
     """
-    # Check if a product with the same SKU already exists
-    db_product_check = db.query(models.Product).filter(models.Product.sku == product.sku).first()
-    if db_product_check:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Product with SKU '{product.sku}' already exists."
-        )
-
     # Exclude images from the main model dump, as they are a related model
     product_data = product.model_dump(exclude={"images"})
     db_product = models.Product(**product_data)
@@ -60,8 +46,15 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
             db_product.images.append(new_image)
 
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The unique index on sku rejects duplicates atomically, no pre-check SELECT needed
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Product with SKU '{product.sku}' already exists."
+        )
 
     # For the response, dynamically calculate and set the status
     low_stock_threshold = get_low_stock_threshold(db)
@@ -77,8 +70,8 @@ def update_product(product_id: int, product_update: schemas.ProductUpdate, db: S
     Updates an existing product.
     The 'status' field is dynamically recalculated after the update.
     """
-    # Fetch the product and its images
-    db_product = db.query(models.Product).options(joinedload(models.Product.images)).filter(models.Product.id == product_id).first()
+    # Fetch the product (images are loaded for the response after the update)
+    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
 
     if db_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
@@ -88,12 +81,18 @@ def update_product(product_id: int, product_update: schemas.ProductUpdate, db: S
 
     # Handle image updates: This replaces the entire set of images
     if 'images' in update_data:
-        # Clear the existing image relationship
-        db_product.images.clear()
-        # Add the new images from the request
-        for img_data_dict in update_data['images']:
-            new_image = models.ProductImage(**img_data_dict)
-            db_product.images.append(new_image)
+        # One DELETE for the existing images and one multi-row INSERT for the new ones,
+        # instead of loading the collection and flushing it row by row
+        db.query(models.ProductImage).filter(
+            models.ProductImage.product_id == product_id
+        ).delete(synchronize_session=False)
+        if update_data['images']:
+            db.execute(
+                insert(models.ProductImage),
+                [{**img_data_dict, "product_id": product_id} for img_data_dict in update_data['images']]
+            )
+        # The bulk statements bypass the session, so reload the collection for the response
+        db.expire(db_product, ['images'])
         # Remove 'images' from update_data so it's not processed by the loop below
         del update_data['images']
 
@@ -103,7 +102,6 @@ def update_product(product_id: int, product_update: schemas.ProductUpdate, db: S
 
     db.add(db_product)
     db.commit()
-    db.refresh(db_product)
 
     # For the response, dynamically calculate and set the new status
     low_stock_threshold = get_low_stock_threshold(db)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from ..database import get_db
+from ..database import get_async_db
 from ..schemas import schemas
 from ..models import models
 
@@ -12,17 +13,17 @@ router = APIRouter()
 # GET all vehicles
 # ---------------------------
 @router.get("/vehicles", response_model=List[schemas.Vehicle])
-def get_all_vehicles(db: Session = Depends(get_db)):
-    return db.query(models.Vehicle).all()
+async def get_all_vehicles(db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(select(models.Vehicle))).all()
 
 
 # ---------------------------
 # CREATE vehicle
 # ---------------------------
 @router.post("/vehicles", response_model=schemas.Vehicle)
-def create_vehicle(
+async def create_vehicle(
         vehicle: schemas.VehicleCreate,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     db_vehicle = models.Vehicle(
         vehicle_number=vehicle.vehicle_number,
@@ -36,8 +37,7 @@ def create_vehicle(
     )
 
     db.add(db_vehicle)
-    db.commit()              # 🔥 REQUIRED
-    db.refresh(db_vehicle)
+    await db.commit()        # 🔥 REQUIRED
 
     return db_vehicle
 
@@ -46,16 +46,12 @@ def create_vehicle(
 # DELETE vehicle
 # ---------------------------
 @router.delete("/vehicles/{vehicle_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
-    db_vehicle = (
-        db.query(models.Vehicle)
-        .filter(models.Vehicle.id == vehicle_id)
-        .first()
-    )
+async def delete_vehicle(vehicle_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_vehicle = await db.get(models.Vehicle, vehicle_id)
 
     if not db_vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
 
-    db.delete(db_vehicle)
-    db.commit()
+    await db.delete(db_vehicle)
+    await db.commit()
     return None
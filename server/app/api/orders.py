@@ -1,31 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload  # For eager-loading related models
+from sqlalchemy import insert, update, case, select, func
+from sqlalchemy.orm import Session, defaultload, lazyload, selectinload  # For eager-loading related models
 from typing import List
 from ..database import get_db
 from ..schemas import schemas
 from ..models import models
+from ..utils.streaming import stream_json_array
 
 router = APIRouter()
 
 
+def adjust_stock(db: Session, deltas: dict):
+    """
+    Applies per-product stock changes ({product_id: delta}) in a single
+    UPDATE ... SET stock_quantity = stock_quantity + CASE id WHEN ... END statement.
+    """
+    if not deltas:
+        return
+    db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(deltas.keys()))
+        .values(stock_quantity=models.Product.stock_quantity + case(deltas, value=models.Product.id))
+        # Copy the new values onto any Product already loaded in the session (via RETURNING on Postgres)
+        .execution_options(synchronize_session="fetch")
+    )
+
+
 @router.get("/", response_model=List[schemas.Order])
-def get_all_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_all_orders(skip: int = 0, limit: int = 100):
     """
     Fetches all orders, eager-loading item and product details.
+    The page is streamed in batches instead of being materialized in full.
     """
-    orders = (
-        db.query(models.Order)
+    stmt = (
+        select(models.Order)
         .options(
-            # Eager load items, and within items, eager load the product
-            joinedload(models.Order.items)
-            .joinedload(models.OrderItem.product)
+            # Eager load items, and within items, the product, via separate IN queries
+            # (no orders x items row duplication, and limit/offset stay on the orders query).
+            # Product images are not part of the response, so their selectin default is skipped.
+            selectinload(models.Order.items)
+            .selectinload(models.OrderItem.product)
+            .lazyload(models.Product.images)
         )
         .order_by(models.Order.order_date.desc())
         .offset(skip)
         .limit(limit)
-        .all()
     )
-    return orders
+    return stream_json_array(stmt, schemas.Order)
 
 @router.post("/", response_model=schemas.Order, status_code=status.HTTP_201_CREATED)
 def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
@@ -38,33 +59,50 @@ def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="An order must contain at least one item.")
 
     subtotal = 0
-    total_gst = 0
-    order_products_details = []  # To temporarily store product info for calculations
+    pre_discount_gst = 0  # GST if no discount applied: sum(item_total * gst_rate / 100)
 
-    # Step 1: Validate products, check stock, and calculate subtotal
+    # Total quantity per product, so repeated lines for one product are checked against its stock together
+    requested_quantities = {}
     for item_data in order.items:
-        product = db.query(models.Product).filter(models.Product.id == item_data.product_id).first()
+        requested_quantities[item_data.product_id] = requested_quantities.get(item_data.product_id, 0) + item_data.quantity
+
+    # Fetch just the columns the checks and totals need for every ordered product in one
+    # query (plain rows, no ORM objects), locking the rows (in id order) until commit
+    # so concurrent orders cannot oversell the same stock
+    products = {
+        product.id: product
+        for product in db.execute(
+            select(
+                models.Product.id, models.Product.name, models.Product.stock_quantity,
+                models.Product.selling_price, models.Product.gst_rate
+            )
+            .where(models.Product.id.in_(requested_quantities.keys()))
+            .order_by(models.Product.id)
+            .with_for_update()
+        )
+    }
+
+    # Step 1: Validate everything against the fetched rows before touching the database
+    missing_ids = sorted(requested_quantities.keys() - products.keys())
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Product(s) with id {', '.join(map(str, missing_ids))} not found.")
 
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product with id {item_data.product_id} not found.")
+    for product_id, quantity in requested_quantities.items():
+        product = products[product_id]
 
         if product.selling_price is None or product.gst_rate is None:
             raise HTTPException(status_code=400, detail=f"Product '{product.name}' is missing selling price or GST rate.")
 
-        if product.stock_quantity < item_data.quantity:
+        if product.stock_quantity < quantity:
             raise HTTPException(
                 status_code=400,
-                detail=f"Not enough stock for {product.name}. Available: {product.stock_quantity}, Requested: {item_data.quantity}"
+                detail=f"Not enough stock for {product.name}. Available: {product.stock_quantity}, Requested: {quantity}"
             )
 
-        item_total_price = product.selling_price * item_data.quantity
+        # Subtotal and pre-discount GST in the same pass
+        item_total_price = product.selling_price * quantity
         subtotal += item_total_price
-
-        order_products_details.append({
-            "product_obj": product,
-            "quantity": item_data.quantity,
-            "item_total_price": item_total_price
-        })
+        pre_discount_gst += item_total_price * (product.gst_rate / 100)
 
     # Step 2: Calculate the total discount amount
     total_discount_amount = 0
@@ -76,21 +114,13 @@ def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
             if total_discount_amount > subtotal:
                 raise HTTPException(status_code=400, detail="Fixed discount cannot be greater than the subtotal.")
 
-    # Step 3: Calculate total GST based on proportional discount distribution
-    for item in order_products_details:
-        item_total_price = item["item_total_price"]
-        product_obj = item["product_obj"]
-
-        # Calculate this item's proportional share of the discount
-        item_discount = 0
-        if subtotal > 0 and total_discount_amount > 0:
-            item_share_of_subtotal = item_total_price / subtotal
-            item_discount = item_share_of_subtotal * total_discount_amount
-
-        # Calculate GST on the post-discount (taxable) value
-        taxable_value = item_total_price - item_discount
-        item_gst = taxable_value * (product_obj.gst_rate / 100)
-        total_gst += item_gst
+    # Step 3: Calculate total GST based on proportional discount distribution.
+    # Each item's discount share is item_total / subtotal, so its taxable value is
+    # item_total * (1 - discount / subtotal); that factor is common to every item and
+    # the per-item sum collapses to the pre-discount GST scaled by it.
+    total_gst = pre_discount_gst
+    if subtotal > 0 and total_discount_amount > 0:
+        total_gst = pre_discount_gst * (1 - total_discount_amount / subtotal)
 
     # Step 4: Calculate the final total amount
     total_amount = (subtotal - total_discount_amount) + total_gst + (order.shipping_charges or 0)
@@ -107,22 +137,22 @@ def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
 
     db_order = models.Order(**db_order_data)
 
-    # Step 6: Create OrderItem objects, link them to the order, and update product stock
-    for item in order_products_details:
-        product_obj = item["product_obj"]
-        quantity = item["quantity"]
-
-        order_item = models.OrderItem(quantity=quantity)
-        order_item.product = product_obj
-        db_order.items.append(order_item)
+    # Step 6: Insert the order to get its id, then all of its items in one multi-row INSERT
+    db.add(db_order)
+    db.flush()
+    db.execute(
+        insert(models.OrderItem),
+        [
+            {"order_id": db_order.id, "product_id": product_id, "quantity": quantity}
+            for product_id, quantity in requested_quantities.items()
+        ]
+    )
 
-        # Deduct stock
-        product_obj.stock_quantity -= quantity
+    # Deduct stock for every product in one statement (rows are already locked above)
+    adjust_stock(db, {product_id: -quantity for product_id, quantity in requested_quantities.items()})
 
     # Step 7: Commit the transaction
-    db.add(db_order)
     db.commit()
-    db.refresh(db_order)
     return db_order
 
 
@@ -133,7 +163,7 @@ def update_order(order_id: int, order_update: schemas.OrderUpdate, db: Session =
     Also handles restocking items if an order is Cancelled or Returned.
     """
     db_order = db.query(models.Order).options(
-        joinedload(models.Order.items).joinedload(models.OrderItem.product)
+        selectinload(models.Order.items).selectinload(models.OrderItem.product).lazyload(models.Product.images)
     ).filter(models.Order.id == order_id).first()
 
     if db_order is None:
@@ -148,26 +178,49 @@ def update_order(order_id: int, order_update: schemas.OrderUpdate, db: Session =
     new_status = db_order.status
     restock_statuses = [models.OrderStatus.Cancelled, models.OrderStatus.Returned]
 
+    # Total quantity per product, summed in SQL: an order can hold several lines for the same
+    # product (e.g. one per CSV row from the bulk import), which the ORM identity map would
+    # collapse into one item, and every line's stock moves together
+    order_quantities = dict(db.execute(
+        select(models.OrderItem.product_id, func.sum(models.OrderItem.quantity))
+        .where(models.OrderItem.order_id == order_id)
+        .group_by(models.OrderItem.product_id)
+    ).all())
+
     # Handle stock adjustment if status changed to or from a restock-required status
     if new_status in restock_statuses and original_status not in restock_statuses:
-        # Order was just cancelled/returned, add stock back
-        for item in db_order.items:
-            item.product.stock_quantity += item.quantity
+        # Order was just cancelled/returned, add stock back. Lock the products in id order
+        # first, as create_order does, so the UPDATE cannot deadlock with a concurrent order.
+        db.execute(
+            select(models.Product.id)
+            .where(models.Product.id.in_(order_quantities.keys()))
+            .order_by(models.Product.id)
+            .with_for_update()
+        )
+        adjust_stock(db, order_quantities)
 
     elif original_status in restock_statuses and new_status not in restock_statuses:
-        # Order was previously cancelled/returned and is now being re-opened
-        for item in db_order.items:
-            if item.product.stock_quantity < item.quantity:
+        # Order was previously cancelled/returned and is now being re-opened.
+        # Lock the products and check their current stock before taking it again.
+        current_stock = dict(
+            db.query(models.Product.id, models.Product.stock_quantity)
+            .filter(models.Product.id.in_(order_quantities.keys()))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .all()
+        )
+        product_names = {item.product_id: item.product.name for item in db_order.items}
+        for product_id, quantity in order_quantities.items():
+            if current_stock.get(product_id, 0) < quantity:
                 # Check if there is enough stock to "un-cancel"
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Cannot reverse return for {item.product.name}. Not enough stock available."
+                    detail=f"Cannot reverse return for {product_names[product_id]}. Not enough stock available."
                 )
-            item.product.stock_quantity -= item.quantity
+        adjust_stock(db, {product_id: -quantity for product_id, quantity in order_quantities.items()})
 
     db.add(db_order)
     db.commit()
-    db.refresh(db_order)
     return db_order
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -175,7 +228,10 @@ def delete_order(order_id: int, db: Session = Depends(get_db)):
     """
     Deletes an order from the database.
     """
-    db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    # The delete cascade loads the items (and their products by default), but never needs the images
+    db_order = db.query(models.Order).options(
+        defaultload(models.Order.items).defaultload(models.OrderItem.product).lazyload(models.Product.images)
+    ).filter(models.Order.id == order_id).first()
 
     if db_order is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
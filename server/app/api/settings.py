@@ -1,21 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
 from typing import List
 
-from ..database import get_db
+from ..database import get_async_db
 from ..schemas import schemas
 from ..models import models
+from ..utils.settings_helpers import invalidate_settings_cache
 
 router = APIRouter()
 
 # --- SETTINGS API ENDPOINTS ---
 
 @router.get("/", response_model=List[schemas.AppSetting])
-def get_all_settings(db: Session = Depends(get_db)):
+async def get_all_settings(db: AsyncSession = Depends(get_async_db)):
     """
     Fetches all app settings from the database.
     """
-    settings = db.query(models.AppSettings).all()
+    settings = (await db.scalars(select(models.AppSettings))).all()
 
     # If no settings are found, create a default setting
     if not settings:
@@ -24,39 +27,31 @@ def get_all_settings(db: Session = Depends(get_db)):
             setting_value="10"
         )
         db.add(default_setting)
-        db.commit()
-        db.refresh(default_setting)
+        await db.commit()
         return [default_setting]
 
     return settings
 
 @router.put("/", response_model=List[schemas.AppSetting])
-def update_settings(payload: schemas.AppSettingsUpdate, db: Session = Depends(get_db)):
+async def update_settings(payload: schemas.AppSettingsUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Updates or creates (upserts) multiple settings at once.
     """
-    updated_settings_keys = []
-    for setting_data in payload.settings:
-        # Find the setting in the database by its key
-        db_setting = db.query(models.AppSettings).filter(
-            models.AppSettings.setting_key == setting_data.setting_key
-        ).first()
-
-        if db_setting:
-            # If the setting exists, update its value
-            db_setting.setting_value = setting_data.setting_value
-        else:
-            # If the setting does not exist, create a new one
-            db_setting = models.AppSettings(**setting_data.model_dump())
-            db.add(db_setting)
-
-        updated_settings_keys.append(setting_data.setting_key)
-
-    db.commit()
-
-    # Return the refreshed settings from the database
-    updated_settings = db.query(models.AppSettings).filter(
-        models.AppSettings.setting_key.in_(updated_settings_keys)
-    ).all()
-
-    return updated_settings
\ No newline at end of file
+    # One value per key (last wins), written with a single INSERT ... ON CONFLICT DO UPDATE
+    new_values = {setting_data.setting_key: setting_data.setting_value for setting_data in payload.settings}
+    if new_values:
+        upsert = insert(models.AppSettings).values(
+            [{"setting_key": key, "setting_value": value} for key, value in new_values.items()]
+        )
+        await db.execute(upsert.on_conflict_do_update(
+            index_elements=[models.AppSettings.setting_key],
+            set_={"setting_value": upsert.excluded.setting_value}
+        ))
+        await db.commit()
+    invalidate_settings_cache()
+
+    # The stored rows now equal the payload, so return it without re-reading them
+    return [
+        schemas.AppSetting(setting_key=key, setting_value=value)
+        for key, value in new_values.items()
+    ]
@@ -1,28 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.exc import IntegrityError
 from typing import List
 from ..database import get_db
 from ..schemas import schemas
 from ..models import models
 from .. import security
-from ..config import conf
+from ..config import get_mail_conf
+from ..redis_client import redis_client
+from ..utils.streaming import stream_json_array
 
 from fastapi_mail import FastMail, MessageSchema
 import random
-import time
 
 router = APIRouter()
 
-# Store OTP with expiry time (email: (otp, expiry))
-otp_store = {}
+# OTPs live in Redis so every worker sees them and they expire on their own:
+#   otp:{email}          hash {otp, attempts}, TTL = OTP_TTL_SECONDS
+#   otp:{email}:cooldown set while a new OTP may not be requested yet
+OTP_TTL_SECONDS = 300  # 5 minutes
+OTP_RESEND_COOLDOWN_SECONDS = 60
+OTP_MAX_ATTEMPTS = 3
+
+def _otp_key(email: str) -> str:
+    return f"otp:{email}"
+
+def _otp_cooldown_key(email: str) -> str:
+    return f"otp:{email}:cooldown"
 
 # =========================
 # GET ALL USERS
 # =========================
 @router.get("/", response_model=List[schemas.User])
-def get_all_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+def get_all_users(skip: int = 0, limit: int = 100):
+    # Only the columns schemas.User exposes; never pull hashed_password for a listing
+    stmt = select(models.User).options(
+        load_only(models.User.id, models.User.name, models.User.email, models.User.role, models.User.is_active)
+    ).offset(skip).limit(limit)
+    return stream_json_array(stmt, schemas.User)
 
 
 # =========================
@@ -31,21 +48,21 @@ def get_all_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-
     hashed_password = security.get_password_hash(user.password)
     user_data = user.model_dump(exclude={"password"})
 
     db_user = models.User(**user_data, hashed_password=hashed_password)
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The unique index on email rejects duplicates atomically, no pre-check SELECT needed
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
 
     return db_user
 
@@ -67,7 +84,6 @@ def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Dep
         setattr(db_user, key, value)
 
     db.commit()
-    db.refresh(db_user)
 
     return db_user
 
@@ -93,9 +109,14 @@ def login(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
 
     user = db.query(models.User).filter(models.User.email == form_data.email).first()
 
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not security.verify_password_cached(user.email, form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Move legacy bcrypt hashes to the current scheme while the plain password is at hand
+    if security.password_needs_rehash(user.hashed_password):
+        user.hashed_password = security.get_password_hash(form_data.password)
+        db.commit()
+
     access_token = security.create_access_token(
         data={"sub": user.email, "role": user.role}
     )
@@ -107,36 +128,46 @@ def login(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
     }
 
 
+def _find_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def _set_password(db: Session, email: str, new_password: str) -> bool:
+    """
+    Hashes and stores a new password for the user with this email.
+    Returns False if there is no such user.
+    """
+    user = _find_user_by_email(db, email)
+    if not user:
+        return False
+    user.hashed_password = security.get_password_hash(new_password)
+    db.commit()
+    return True
+
+
 @router.post("/forgot-password")
 async def forgot_password(email: str, db: Session = Depends(get_db)):
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+    # The session is synchronous, so query it in the threadpool rather than on the event loop
+    user = await run_in_threadpool(_find_user_by_email, db, email)
     if not user:
         raise HTTPException(status_code=404, detail="Email not found")
 
-    current_time = time.time()
-
-    # Check if resend cooldown exists
-    existing_entry = otp_store.get(email)
-
-    if existing_entry:
-        resend_allowed_at = existing_entry["resend_allowed_at"]
-        if current_time < resend_allowed_at:
-            remaining = int(resend_allowed_at - current_time)
-            raise HTTPException(
-                status_code=429,
-                detail=f"Please wait {remaining} seconds before requesting OTP again"
-            )
+    # Claim the resend cooldown atomically; fails if one is still running
+    if not await redis_client.set(_otp_cooldown_key(email), 1, ex=OTP_RESEND_COOLDOWN_SECONDS, nx=True):
+        remaining = max(await redis_client.ttl(_otp_cooldown_key(email)), 1)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Please wait {remaining} seconds before requesting OTP again"
+        )
 
-    # Generate new OTP
+    # Generate new OTP (replaces any previous one and resets its attempts)
     otp = str(random.randint(100000, 999999))
 
-    otp_store[email] = {
-        "otp": otp,
-        "expiry": current_time + 300,  # 5 minutes
-        "attempts": 0,
-        "resend_allowed_at": current_time + 60  # 60 sec cooldown
-    }
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(_otp_key(email))
+        pipe.hset(_otp_key(email), mapping={"otp": otp, "attempts": 0})
+        pipe.expire(_otp_key(email), OTP_TTL_SECONDS)
+        await pipe.execute()
 
     message = MessageSchema(
         subject="Your Password Reset OTP",
@@ -145,47 +176,43 @@ async def forgot_password(email: str, db: Session = Depends(get_db)):
         subtype="plain"
     )
 
-    fm = FastMail(conf)
+    fm = FastMail(get_mail_conf())
     await fm.send_message(message)
 
     return {"message": "OTP sent successfully"}
+
 @router.post("/reset-password")
-def reset_password(data: schemas.ResetPassword, db: Session = Depends(get_db)):
+async def reset_password(data: schemas.ResetPassword, db: Session = Depends(get_db)):
 
-    entry = otp_store.get(data.email)
+    # Count this attempt and read the OTP in one round-trip (MULTI/EXEC)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hincrby(_otp_key(data.email), "attempts", 1)
+        pipe.hget(_otp_key(data.email), "otp")
+        attempts, stored_otp = await pipe.execute()
 
-    if not entry:
+    # Missing or expired OTP (HINCRBY just recreated the key without a TTL, so drop it)
+    if stored_otp is None:
+        await redis_client.delete(_otp_key(data.email))
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
 
-    current_time = time.time()
-
-    # Check expiry
-    if current_time > entry["expiry"]:
-        del otp_store[data.email]
-        raise HTTPException(status_code=400, detail="OTP expired")
-
     # Check max attempts
-    if entry["attempts"] >= 3:
-        del otp_store[data.email]
+    if attempts > OTP_MAX_ATTEMPTS:
+        await redis_client.delete(_otp_key(data.email))
         raise HTTPException(status_code=403, detail="Maximum OTP attempts exceeded")
 
     # Validate OTP
-    if entry["otp"] != data.otp:
-        entry["attempts"] += 1
-        remaining = 3 - entry["attempts"]
+    if stored_otp != data.otp:
+        remaining = OTP_MAX_ATTEMPTS - attempts
         raise HTTPException(
             status_code=400,
             detail=f"Invalid OTP. {remaining} attempts remaining"
         )
 
-    # OTP correct → reset password
-    user = db.query(models.User).filter(models.User.email == data.email).first()
-    if not user:
+    # OTP correct → reset password. The lookup, the (deliberately slow) hash and the commit
+    # all block, so they run together in the threadpool instead of on the event loop.
+    if not await run_in_threadpool(_set_password, db, data.email, data.new_password):
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.hashed_password = security.get_password_hash(data.new_password)
-    db.commit()
-
-    del otp_store[data.email]
+    await redis_client.delete(_otp_key(data.email), _otp_cooldown_key(data.email))
 
     return {"message": "Password reset successful"}
\ No newline at end of file
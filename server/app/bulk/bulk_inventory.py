@@ -2,27 +2,89 @@
 
 import csv
 import io
-import uuid
+import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional, Any
 from pydantic import BaseModel
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..schemas import schemas
 from ..models import models
+from .csv_reading import read_upload_csv
+from .row_validation import validate_rows_parallel
 
 # Import helper functions for dynamic status calculation
-from ..utils.settings_helpers import get_low_stock_threshold, get_product_status
-# Import the shared in-memory dictionary for error reports
-from ..utils.report_store import error_reports
+from ..utils.settings_helpers import get_low_stock_threshold
+# Import the shared (Redis-backed) store for error reports
+from ..utils.report_store import save_error_report, get_error_report
 
 router = APIRouter(
     prefix="/bulk/inventory",  # Prefix for all routes in this file
     tags=["Bulk Inventory"]  # Tag for API documentation
 )
 
+# Numeric CSV columns, coerced in bulk before the per-row pass
+INTEGER_COLUMNS = ["stock_quantity", "reorder_level"]
+FLOAT_COLUMNS = ["cost_price", "selling_price", "gst_rate"]
+
+# Text columns that are left out of the product data when blank
+OPTIONAL_TEXT_COLUMNS = ("category", "supplier", "description", "last_restocked")
+
+def row_to_product_data(row: Dict[str, str], sku: str, numbers: tuple) -> Dict[str, Any]:
+    """
+    Builds the ProductBase/ProductCreate input for one CSV row from its text values
+    and its already-coerced numeric columns (in INTEGER_COLUMNS + FLOAT_COLUMNS order).
+    """
+    stock_quantity, reorder_level, cost_price, selling_price, gst_rate = numbers
+    product_data = {
+        "name": row["name"], "sku": sku,
+        "stock_quantity": int(stock_quantity), "reorder_level": int(reorder_level),
+        "cost_price": cost_price, "selling_price": selling_price, "gst_rate": gst_rate,
+    }
+    for column in OPTIONAL_TEXT_COLUMNS:
+        value = row.get(column)
+        if value:
+            product_data[column] = value
+    return product_data
+
+# Max SKUs bound into a single IN (...) lookup during CSV import
+SKU_LOOKUP_CHUNK_SIZE = 1000
+
+# Columns written by the import. On an existing SKU the core columns are overwritten, while
+# description and last_restocked keep their stored value unless the CSV provides one.
+UPSERT_COLUMNS = {
+    "name", "sku", "stock_quantity", "category", "supplier", "reorder_level",
+    "cost_price", "selling_price", "gst_rate", "description", "last_restocked",
+}
+def upsert_row(validated_data: schemas.ProductBase) -> Dict[str, Any]:
+    """
+    The upsert parameters for one validated row, read straight from the model's
+    field values (no model_dump serialization pass).
+    """
+    fields = validated_data.__dict__
+    return {column: fields[column] for column in UPSERT_COLUMNS}
+
+_product_insert = pg_insert(models.Product)
+PRODUCT_UPSERT = _product_insert.on_conflict_do_update(
+    index_elements=[models.Product.sku],
+    set_={
+        column: (
+            func.coalesce(_product_insert.excluded[column], models.Product.__table__.c[column])
+            if column in ("description", "last_restocked")
+            else _product_insert.excluded[column]
+        )
+        for column in sorted(UPSERT_COLUMNS - {"sku"})
+    },
+)
+
+# Products read (and CSV bytes sent) per chunk when streaming the export
+EXPORT_BATCH_SIZE = 1000
+
 # Pydantic model for the upload response body
 class BulkUploadResponse(BaseModel):
     message: str
@@ -31,29 +93,37 @@ class BulkUploadResponse(BaseModel):
     errors: List[str]  # A list of error messages
     error_report_id: Optional[str] = None  # An ID to download a file of failed rows
 
-@router.post("/upload-csv", response_model=BulkUploadResponse)
-async def upload_inventory_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def write_products(db: Session, product_rows: List[Dict[str, Any]]):
     """
-    Imports/updates products from a CSV file.
-    The 'status' column is no longer read from the CSV or saved to the DB.
+    Writes every product with one INSERT ... ON CONFLICT (sku) DO UPDATE executemany,
+    inside a SAVEPOINT that rolls itself back if the statement fails, then commits.
+    Rows are written in SKU order so concurrent imports lock existing products in the
+    same order and cannot deadlock on each other.
     """
-    
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a .csv file.")
-
-    # Read the file content
-    contents = await file.read()
-    if not contents:
-        raise HTTPException(status_code=400, detail="The file is empty.")
+    if product_rows:
+        with db.begin_nested():
+            db.execute(PRODUCT_UPSERT, sorted(product_rows, key=lambda row: row["sku"]))
+    db.commit()
 
+def parse_inventory_csv(csv_file, db: Session):
+    """
+    Parses an inventory CSV and sorts its rows into failed rows and update/create
+    candidates (by whether the SKU already exists). Synchronous and CPU-heavy, so the
+    endpoint runs it in the threadpool rather than on the event loop.
+    Returns (original_fieldnames, failed_rows, update_candidates, create_candidates).
+    """
+    # Parse straight from the uploaded (spooled) file. Every column is read as text so a bad
+    # value fails only its own row, not the whole file; rows with too many fields come back
+    # in ragged_rows and fail on their own too.
     try:
-        file_text = contents.decode('utf-8')
+        df, ragged_rows = read_upload_csv(csv_file)
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Failed to decode file. Please ensure it is UTF-8 encoded.")
-
-    file_reader = io.StringIO(file_text)
-    csv_reader = csv.DictReader(file_reader)
-    original_fieldnames = csv_reader.fieldnames or []
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The file is empty.")
+    except pd.errors.ParserError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse CSV file: {e}")
+    original_fieldnames = list(df.columns)
 
     # Define the headers required in the CSV file
     expected_headers = [
@@ -61,90 +131,136 @@ async def upload_inventory_csv(file: UploadFile = File(...), db: Session = Depen
         "reorder_level", "cost_price", "selling_price", "gst_rate"
     ]
     # Check if all expected headers are present
-    if not all(header in original_fieldnames for header in expected_headers):
+    fieldname_set = set(original_fieldnames)
+    missing_headers = [header for header in expected_headers if header not in fieldname_set]
+    if missing_headers:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid CSV headers. Required headers are: {', '.join(expected_headers)}"
+            detail=f"Invalid CSV headers. Missing: {', '.join(missing_headers)}. Required headers are: {', '.join(expected_headers)}"
         )
 
-    products_to_add = []
-    products_to_update = []
-    update_data_map = {}
     failed_rows = []
-    processed_skus = set()  # To track duplicate SKUs within the file
-    added_skus = []
-    updated_skus = []
-
-    file_reader.seek(0)  # Reset reader to the beginning
-    csv_reader = csv.DictReader(file_reader) 
+    update_candidates = []  # (row, data) for SKUs already in the DB
+    create_candidates = []  # (row, data) for new SKUs
+
+    # Short rows come back as NaN; treat those cells as empty text like the rest
+    df = df.fillna("")
+    csv_rows = df.to_dict(orient="records")  # Original text values, used for the error report
+    skus = df["sku"].str.strip()
+    # First occurrence of each SKU wins; later ones are duplicates
+    is_duplicate = skus.duplicated().tolist()
+
+    # Coerce every numeric column in one vectorized pass; NaN marks an invalid number
+    numeric_values = {
+        column: pd.to_numeric(df[column].str.strip(), errors="coerce")
+        for column in INTEGER_COLUMNS + FLOAT_COLUMNS
+    }
+    invalid_numbers = pd.DataFrame({column: values.isna() for column, values in numeric_values.items()})
+    for column in INTEGER_COLUMNS:
+        invalid_numbers[column] |= numeric_values[column].mod(1).ne(0)
+    first_invalid_column = [
+        column if has_invalid else None
+        for column, has_invalid in zip(invalid_numbers.idxmax(axis=1).tolist(), invalid_numbers.any(axis=1).tolist())
+    ]
+    # One (stock_quantity, reorder_level, cost_price, selling_price, gst_rate) tuple per row
+    numeric_rows = list(zip(*(numeric_values[column].tolist() for column in INTEGER_COLUMNS + FLOAT_COLUMNS)))
+
+    # Look up every SKU in the file that already exists with one IN query per chunk,
+    # instead of one SELECT per row
+    existing_skus = set()
+    file_skus = list(set(skus) - {""})
+    for start in range(0, len(file_skus), SKU_LOOKUP_CHUNK_SIZE):
+        sku_chunk = file_skus[start:start + SKU_LOOKUP_CHUNK_SIZE]
+        existing_skus.update(
+            sku for (sku,) in db.query(models.Product.sku).filter(models.Product.sku.in_(sku_chunk))
+        )
 
     # Process each row in the CSV
-    for row in csv_reader:
-        sku = row.get("sku", "").strip()
+    for index, (row, sku, numbers) in enumerate(zip(csv_rows, skus.tolist(), numeric_rows)):
         error_reason = None
 
-        if not sku:
+        if index in ragged_rows:
+            # Report the row as written, not the empty placeholder standing in for it
+            fields = ragged_rows[index]
+            row = dict(zip(original_fieldnames, fields))
+            error_reason = f"Row has {len(fields)} fields, but the header has {len(original_fieldnames)}."
+        elif not sku:
             error_reason = "Missing SKU."
-        elif sku in processed_skus:
+        elif is_duplicate[index]:
             error_reason = "Duplicate SKU found within the CSV file."
-        else:
-            processed_skus.add(sku)
+        elif first_invalid_column[index] is not None:
+            column = first_invalid_column[index]
+            error_reason = f"Invalid number format: {column} = '{row[column]}'"
 
         if error_reason:
-            row_copy = dict(row)
-            row_copy["error_reason"] = error_reason
-            failed_rows.append(row_copy)
+            # Each row is its own dict from to_dict, so it is annotated in place rather than copied
+            row["error_reason"] = error_reason
+            failed_rows.append(row)
             continue
 
-        try:
-            # Get stock quantity
-            stock = int(row.get("stock_quantity", 0))
-            
-            # Prepare data for schema validation (without 'status')
-            product_data_for_schema = {
-                "name": row["name"], "sku": sku, "stock_quantity": stock,
-                "category": row.get("category") or None, 
-                "supplier": row.get("supplier") or None,
-                "reorder_level": int(row.get("reorder_level", 10)),
-                "cost_price": float(row.get("cost_price", 0.0)),
-                "selling_price": float(row.get("selling_price", 0.0)),
-                "gst_rate": float(row.get("gst_rate", 0.0)),
-                "description": row.get("description") or None,
-                "last_restocked": row.get("last_restocked") or None,
-            }
-            # Remove any keys that have a value of None
-            product_data_for_schema = {k: v for k, v in product_data_for_schema.items() if v is not None}
-
-            # Check if product exists in the DB
-            db_product = db.query(models.Product).filter(models.Product.sku == sku).first()
-
-            if db_product:
-                # Product exists, validate data for an UPDATE
-                validated_data = schemas.ProductBase(**product_data_for_schema)
-                products_to_update.append(db_product)
-                update_data_map[sku] = {"data": validated_data}
-                updated_skus.append(sku)
-            else:
-                # Product is new, validate data for a CREATE
-                product_data_for_schema["images"] = [] # New products start with no images
-                validated_data = schemas.ProductCreate(**product_data_for_schema)
-                
-                # Prepare data for the DB model (without 'status')
-                model_data = validated_data.model_dump()
-                
-                products_to_add.append(models.Product(**model_data))
-                added_skus.append(sku)
-
-        except ValueError as e:
-            error_reason = f"Invalid number format: {e}"
-        except Exception as e:
-            # Catch Pydantic validation errors or other exceptions
-            error_reason = f"Data validation error: {e}" 
+        # Prepare data for schema validation (without 'status')
+        product_data_for_schema = row_to_product_data(row, sku, numbers)
 
-        if error_reason:
-            row_copy = dict(row)
-            row_copy["error_reason"] = error_reason
-            failed_rows.append(row_copy)
+        # Queue the row for batch validation as an UPDATE or a CREATE
+        if sku in existing_skus:
+            update_candidates.append((row, product_data_for_schema))
+        else:
+            create_candidates.append((row, product_data_for_schema))
+
+    return original_fieldnames, failed_rows, update_candidates, create_candidates
+
+@router.post("/upload-csv", response_model=BulkUploadResponse)
+async def upload_inventory_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Imports/updates products from a CSV file.
+    The 'status' column is no longer read from the CSV or saved to the DB.
+    """
+    
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a .csv file.")
+
+    # Parsing, the SKU lookup and classification run off the event loop
+    original_fieldnames, failed_rows, update_candidates, create_candidates = await run_in_threadpool(
+        parse_inventory_csv, file.file, db
+    )
+
+    products_to_add = []
+    products_to_update = []
+    added_skus = []
+    updated_skus = []
+
+    # Update rows without a last_restocked value are already fully typed (numbers were coerced
+    # while parsing, everything else is text), so they go straight into the upsert
+    updates_to_validate = []
+    for row, data in update_candidates:
+        if "last_restocked" in data:
+            updates_to_validate.append((row, data))
+        else:
+            products_to_update.append({column: data.get(column) for column in UPSERT_COLUMNS})
+            updated_skus.append(data["sku"])
+
+    # Validate each remaining group of rows in a single pydantic-core pass
+    validated_updates, update_errors = await validate_rows_parallel("product_update", [data for _, data in updates_to_validate])
+    for index, (row, _) in enumerate(updates_to_validate):
+        validated_data = validated_updates.get(index)
+        if validated_data is None:
+            row["error_reason"] = f"Data validation error: {update_errors[index]}"
+            failed_rows.append(row)
+            continue
+        products_to_update.append(upsert_row(validated_data))
+        updated_skus.append(validated_data.sku)
+
+    # New products start with no images (ProductCreate's default)
+    validated_creates, create_errors = await validate_rows_parallel("product_create", [data for _, data in create_candidates])
+    for index, (row, _) in enumerate(create_candidates):
+        validated_data = validated_creates.get(index)
+        if validated_data is None:
+            row["error_reason"] = f"Data validation error: {create_errors[index]}"
+            failed_rows.append(row)
+            continue
+        # Prepare a row for the upsert (without 'status' or images)
+        products_to_add.append(upsert_row(validated_data))
+        added_skus.append(validated_data.sku)
 
     # --- Database Transaction ---
     error_strings = [f"Row {i+2} (SKU: {row.get('sku', 'N/A')}): {row['error_reason']}" for i, row in enumerate(failed_rows)]
@@ -157,47 +273,18 @@ async def upload_inventory_csv(file: UploadFile = File(...), db: Session = Depen
     error_report_id = None
 
     try:
-        # Perform updates
-        if products_to_update:
-            for product in products_to_update:
-                update_info = update_data_map[product.sku]
-                update_data = update_info["data"] 
-                
-                # Manually update fields from the validated data
-                product.name = update_data.name
-                product.stock_quantity = update_data.stock_quantity
-                # 'status' is not set here
-                product.category = update_data.category
-                product.supplier = update_data.supplier
-                product.reorder_level = update_data.reorder_level
-                product.cost_price = update_data.cost_price
-                product.selling_price = update_data.selling_price
-                product.gst_rate = update_data.gst_rate
-                
-                if hasattr(update_data, 'description') and update_data.description:
-                    product.description = update_data.description
-                if hasattr(update_data, 'last_restocked') and update_data.last_restocked:
-                    product.last_restocked = update_data.last_restocked
-                    
-            updated_count = len(products_to_update)
-
-        # Perform bulk inserts
-        if products_to_add:
-            db.bulk_save_objects(products_to_add)
-            added_count = len(products_to_add)
-
-        db.commit()
+        await run_in_threadpool(write_products, db, products_to_update + products_to_add)
+        updated_count = len(products_to_update)
+        added_count = len(products_to_add)
 
     except Exception as e:
-        # If commit fails, roll back
-        db.rollback()
+        # The savepoint has already undone the upsert
         db_error_message = f"Database error during commit: {e}"
         error_strings.append(db_error_message)
         
         # If there were failed rows, store them for download
         if failed_rows:
-            error_report_id = str(uuid.uuid4())
-            error_reports[error_report_id] = {"headers": original_fieldnames, "rows": failed_rows}
+            error_report_id = await save_error_report(original_fieldnames, failed_rows)
 
         return BulkUploadResponse(
             message="CSV processing failed during database operation.",
@@ -209,8 +296,7 @@ async def upload_inventory_csv(file: UploadFile = File(...), db: Session = Depen
 
     # If commit succeeded but there were failed rows
     if failed_rows:
-        error_report_id = str(uuid.uuid4())
-        error_reports[error_report_id] = {"headers": original_fieldnames, "rows": failed_rows} 
+        error_report_id = await save_error_report(original_fieldnames, failed_rows)
 
     # Build the final success message
     message_parts = []
@@ -241,41 +327,56 @@ async def export_inventory_csv(db: Session = Depends(get_db)):
     Exports all inventory products to a CSV file.
     Status is calculated dynamically during the export.
     """
-    output = io.StringIO()
     # Add 'status' to the headers for the export file
     headers = [
         "name", "sku", "stock_quantity", "category", "supplier",
         "reorder_level", "cost_price", "selling_price", "gst_rate", "status"
     ]
-    writer = csv.DictWriter(output, fieldnames=headers)
-    writer.writeheader()
-    
+
     # Get the dynamic low stock threshold
     low_stock_threshold = get_low_stock_threshold(db)
-    
-    products = db.query(models.Product).all()
-    for product in products:
-        
-        # Calculate the status for each product
-        calculated_status = get_product_status(product.stock_quantity, low_stock_threshold)
-        
-        writer.writerow({
-            "name": product.name,
-            "sku": product.sku,
-            "stock_quantity": product.stock_quantity,
-            "category": product.category,
-            "supplier": product.supplier,
-            "reorder_level": product.reorder_level,
-            "cost_price": product.cost_price,
-            "selling_price": product.selling_price,
-            "gst_rate": product.gst_rate,
-            # Use the calculated status's value (e.g., "In Stock")
-            "status": calculated_status.value if calculated_status else None
-        })
-    output.seek(0)
+    # Status strings (e.g. "In Stock") looked up once instead of per row
+    out_of_stock = schemas.StockStatus.Out_of_Stock.value
+    low_stock = schemas.StockStatus.Low_Stock.value
+    in_stock = schemas.StockStatus.In_Stock.value
+
+    def iter_csv():
+        """
+        Yields the CSV one batch of EXPORT_BATCH_SIZE products at a time, reading them
+        through a server-side cursor so neither the rows nor the file sit in memory whole.
+        The body is sent after the endpoint returns, so the stream uses its own session.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(headers)
+        yield output.getvalue().encode()
+
+        stream_db = SessionLocal()
+        try:
+            # Only the exported columns, as plain rows: no ORM instance per product
+            products = stream_db.execute(
+                select(
+                    models.Product.name, models.Product.sku, models.Product.stock_quantity,
+                    models.Product.category, models.Product.supplier, models.Product.reorder_level,
+                    models.Product.cost_price, models.Product.selling_price, models.Product.gst_rate
+                ).execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+            )
+            for batch in products.partitions():
+                output.seek(0)
+                output.truncate()
+                for product in batch:
+                    # Same classification as get_product_status, inlined against the bound values
+                    quantity = product.stock_quantity
+                    status_value = out_of_stock if quantity <= 0 else low_stock if quantity <= low_stock_threshold else in_stock
+                    # Rows come back in header order, so they are written positionally
+                    writer.writerow((*product, status_value))
+                yield output.getvalue().encode()
+        finally:
+            stream_db.close()
+
     # Return a StreamingResponse to send the file to the user
     return StreamingResponse(
-        output,
+        iter_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=inventory_export.csv",
                  "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -309,8 +410,8 @@ async def download_inventory_errors(report_id: str):
     """
     Downloads a CSV file of rows that failed during a previous import.
     """
-    # Retrieve the report from the in-memory store
-    report_data = error_reports.get(report_id)
+    # Retrieve the report from the shared store
+    report_data = await get_error_report(report_id)
     
     if not report_data:
         raise HTTPException(status_code=404, detail="Error report not found or expired.")
@@ -323,24 +424,33 @@ async def download_inventory_errors(report_id: str):
         "reorder_level", "cost_price", "selling_price", "gst_rate", "error_reason"
     ]
 
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=headers_with_error, extrasaction='ignore')
-    writer.writeheader()
+    data_headers = headers_with_error[:-1]
 
-    # Write each failed row along with its error
-    for row_dict in failed_rows:
-        row_to_write = {header: row_dict.get(header, "") for header in headers_with_error if header != "error_reason"}
-        row_to_write["error_reason"] = row_dict.get("error_reason", "Unknown error")
-        writer.writerow(row_to_write)
+    def iter_csv():
+        """
+        Yields the file EXPORT_BATCH_SIZE rows at a time from one reused buffer,
+        instead of building the whole CSV before sending it.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(headers_with_error)
 
-    output.seek(0)
+        # Write each failed row along with its error
+        for start in range(0, len(failed_rows), EXPORT_BATCH_SIZE):
+            for row_dict in failed_rows[start:start + EXPORT_BATCH_SIZE]:
+                writer.writerow([row_dict.get(header, "") for header in data_headers] + [row_dict.get("error_reason", "Unknown error")])
+            yield output.getvalue().encode()
+            output.seek(0)
+            output.truncate()
 
-    # Clean up the report from memory after it's prepared (optional, but good practice)
-    # if report_id in error_reports:
-    #     del error_reports[report_id]
+        # Header-only file when there are no rows
+        if output.tell():
+            yield output.getvalue().encode()
+
+    # No cleanup needed: the report expires from the store on its own
 
     return StreamingResponse(
-        output,
+        iter_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=inventory_errors_{report_id}.csv"}
     )
\ No newline at end of file
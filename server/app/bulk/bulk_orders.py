@@ -2,22 +2,23 @@
 
 import csv
 import io
-import uuid
+import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Dict, Optional, Any
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, lazyload
+from typing import List, Dict, Optional, Any, Tuple
 from pydantic import BaseModel
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..schemas import schemas
 from ..models import models
+from .csv_reading import read_upload_csv
 
 # --- NAYE IMPORTS ---
-# Helper function ko 'utils' se import kar rahe hain
-from ..utils.settings_helpers import update_product_status_dynamically
 # Shared error reports ko 'utils' se import kar rahe hain
-from ..utils.report_store import error_reports
+from ..utils.report_store import save_error_report, get_error_report
 
 # Router ko prefix aur tags ke saath set karna clean rehta hai
 router = APIRouter(
@@ -25,6 +26,9 @@ router = APIRouter(
     tags=["Bulk Orders"]
 )
 
+# Order item rows read (and CSV bytes sent) per chunk when streaming the export
+EXPORT_BATCH_SIZE = 1000
+
 # --- Response Model (Sirf Order ka) ---
 class OrderUploadResponse(BaseModel):
     message: str
@@ -34,202 +38,299 @@ class OrderUploadResponse(BaseModel):
 
 # --- HELPER FUNCTIONS YAHAN SE HATA DIYE GAYE HAIN ---
 
-
-# --- Orders CSV Upload ---
-@router.post("/upload-csv", response_model=OrderUploadResponse)
-async def upload_orders_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def failed_row_dict(fieldnames: List[str], row: List[str], line_number: int, error_reason: str) -> Dict[str, Any]:
     """
-    Bulk imports orders. If errors occur, stores failed rows
-    and returns an ID to download them.
+    Builds the error-report entry for a CSV row; only done for rows that failed.
     """
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Invalid file type.")
-
-    contents = await file.read()
-    if not contents:
-        raise HTTPException(status_code=400, detail="The file is empty.")
+    row_dict = dict(zip(fieldnames, row))
+    row_dict["line_number"] = line_number
+    row_dict["error_reason"] = error_reason
+    return row_dict
+
+# Headers required in an orders CSV (also the import template's header row)
+EXPECTED_HEADERS = (
+    "order_group_id", "customer_name", "customer_email", "shipping_address",
+    "payment_method", "item_sku", "item_quantity",
+    "discount_type", "discount_value", "shipping_charges"
+)
+# The export adds the server-calculated totals and the order's current state
+EXPORT_HEADERS = EXPECTED_HEADERS + ("subtotal", "total_gst", "total_amount", "status", "payment_status")
+# CSV value -> enum member, resolved column-wise during parsing (unknown values map to NaN)
+PAYMENT_METHODS = {method.value: method for method in schemas.PaymentMethod}
+DISCOUNT_TYPES = {discount_type.value: discount_type for discount_type in schemas.DiscountType}
 
+def parse_orders_csv(csv_file):
+    """
+    Parses an orders CSV, validating every column in vectorized passes, and groups
+    the valid rows into orders by order_group_id.
+    Returns (original_fieldnames, orders_data, failed_rows, initial_rows_by_group).
+    """
+    # Parse straight from the uploaded (spooled) file. Every column is read as text so a bad
+    # value fails only its own row, not the whole file; rows with too many fields come back
+    # in ragged_rows and fail on their own too.
     try:
-        file_text = contents.decode('utf-8')
+        df, ragged_rows = read_upload_csv(csv_file)
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Failed to decode file (must be UTF-8).")
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The file is empty.")
+    except pd.errors.ParserError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse CSV file: {e}")
+    original_fieldnames = list(df.columns)
 
-    file_reader_initial = io.StringIO(file_text)
-    csv_reader_initial = csv.DictReader(file_reader_initial)
-    original_fieldnames = csv_reader_initial.fieldnames or []
-
-    expected_headers = [
-        "order_group_id", "customer_name", "customer_email", "shipping_address",
-        "payment_method", "item_sku", "item_quantity",
-        "discount_type", "discount_value", "shipping_charges"
-    ]
-    if not all(header in original_fieldnames for header in expected_headers):
+    fieldname_set = set(original_fieldnames)
+    missing_headers = [header for header in EXPECTED_HEADERS if header not in fieldname_set]
+    if missing_headers:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid CSV headers. Required: {', '.join(expected_headers)}"
+            detail=f"Invalid CSV headers. Missing: {', '.join(missing_headers)}. Required: {', '.join(EXPECTED_HEADERS)}"
         )
 
+    # Short rows come back as NaN; treat those cells as empty text like the rest
+    df = df.fillna("")
+    group_ids = df["order_group_id"].str.strip()
+
+    # Coerce and check every column in one vectorized pass; NaN marks an invalid number
+    quantities = pd.to_numeric(df["item_quantity"].str.strip(), errors="coerce")
+    discount_values = pd.to_numeric(df["discount_value"].str.strip(), errors="coerce")
+    shipping_charges = pd.to_numeric(df["shipping_charges"].str.strip(), errors="coerce")
+    discount_type_values = df["discount_type"].str.lower()
+    payment_methods = df["payment_method"].map(PAYMENT_METHODS)
+    discount_types = discount_type_values.map(DISCOUNT_TYPES)
+    # One column per check, in the order they are reported; the first failing one is the row's error
+    invalid = pd.DataFrame({
+        "item_quantity": quantities.isna() | quantities.mod(1).ne(0) | quantities.le(0),
+        "discount_value": discount_values.isna(),
+        "shipping_charges": shipping_charges.isna(),
+        "payment_method": payment_methods.isna(),
+        "discount_type": discount_type_values.ne("") & discount_types.isna(),
+    })
+    first_invalid_column = [
+        column if has_invalid else None
+        for column, has_invalid in zip(invalid.idxmax(axis=1).tolist(), invalid.any(axis=1).tolist())
+    ]
+
+    column = {header: original_fieldnames.index(header) for header in EXPECTED_HEADERS}
     orders_data: Dict[str, Dict[str, Any]] = {}
     failed_rows: List[Dict[str, Any]] = []
-    initial_rows_by_group: Dict[str, List[Dict]] = {}
-    line_number = 1
-
-    file_reader_initial.seek(0)
-    csv_reader_initial = csv.DictReader(file_reader_initial)
+    # Raw (line_number, row) pairs per group, turned into dicts only if the group fails later
+    initial_rows_by_group: Dict[str, List[Tuple[int, List[str]]]] = {}
 
-    for row in csv_reader_initial:
-        line_number += 1
-        group_id = row.get("order_group_id", "").strip()
-        row_copy = dict(row)
-        row_copy["line_number"] = line_number
+    rows = zip(
+        df.values.tolist(), group_ids.tolist(), first_invalid_column,
+        quantities.tolist(), discount_values.tolist(), shipping_charges.tolist(),
+        payment_methods.tolist(), discount_types.tolist(), discount_type_values.tolist()
+    )
+    for line_number, (row, group_id, invalid_column, item_quantity, discount_value, shipping_charge,
+                      payment_method, discount_type, discount_type_value) in enumerate(rows, start=2):
+        ragged_fields = ragged_rows.get(line_number - 2)
+        if ragged_fields is not None:
+            # Use the row as written, not the empty placeholder standing in for it
+            row = ragged_fields
+            group_id = row[column["order_group_id"]].strip()
 
         if group_id:
             if group_id not in initial_rows_by_group:
                 initial_rows_by_group[group_id] = []
-            initial_rows_by_group[group_id].append(row_copy)
+            initial_rows_by_group[group_id].append((line_number, row))
 
         error_reason = None
-        try:
-            if not group_id:
-                error_reason = "Missing 'order_group_id'."
-            else:
-                item_quantity = int(row["item_quantity"])
-                discount_value = float(row.get("discount_value", 0.0))
-                shipping_charges = float(row.get("shipping_charges", 0.0))
-                payment_method = schemas.PaymentMethod(row["payment_method"])
-                raw_discount_type = row.get("discount_type")
-                parsed_discount_type = None
-                if raw_discount_type:
-                    try:
-                        parsed_discount_type = schemas.DiscountType(raw_discount_type.lower())
-                    except ValueError:
-                        raise ValueError(f"Invalid DiscountType '{raw_discount_type}'. Use 'percentage' or 'fixed'.")
-
-                if group_id not in orders_data and not error_reason:
-                    orders_data[group_id] = {
-                        "customer_name": row["customer_name"],
-                        "customer_email": row["customer_email"],
-                        "shipping_address": row["shipping_address"],
-                        "payment_method": payment_method,
-                        "discount_type": parsed_discount_type,
-                        "discount_value": discount_value,
-                        "shipping_charges": shipping_charges,
-                        "items": [],
-                        "line_numbers": []
-                    }
-                if group_id in orders_data and not error_reason:
-                    orders_data[group_id]["items"].append({
-                        "sku": row["item_sku"],
-                        "quantity": item_quantity,
-                        "line_number": line_number
-                    })
-                    orders_data[group_id]["line_numbers"].append(line_number)
-
-        except ValueError as e:
-            error_reason = f"Invalid data format: {e}"
-        except KeyError as e:
-            error_reason = f"Missing required column: {e}"
-        except Exception as e:
-            error_reason = f"Error processing row structure: {e}"
+        if ragged_fields is not None:
+            error_reason = f"Row has {len(row)} fields, but the header has {len(original_fieldnames)}."
+        elif not group_id:
+            error_reason = "Missing 'order_group_id'."
+        elif invalid_column == "payment_method":
+            error_reason = f"Invalid data format: '{row[column['payment_method']]}' is not a valid PaymentMethod"
+        elif invalid_column == "discount_type":
+            error_reason = f"Invalid data format: Invalid DiscountType '{row[column['discount_type']]}'. Use 'percentage' or 'fixed'."
+        elif invalid_column == "item_quantity":
+            error_reason = f"Invalid data format: item_quantity must be a positive whole number, got '{row[column['item_quantity']]}'"
+        elif invalid_column is not None:
+            error_reason = f"Invalid number format: {invalid_column} = '{row[column[invalid_column]]}'"
 
         if error_reason:
-            row_copy["error_reason"] = error_reason
-            failed_rows.append(row_copy)
+            failed_rows.append(failed_row_dict(original_fieldnames, row, line_number, error_reason))
             if group_id in orders_data:
                 orders_data[group_id]["has_error"] = True
+            continue
+
+        if group_id not in orders_data:
+            orders_data[group_id] = {
+                "customer_name": row[column["customer_name"]],
+                "customer_email": row[column["customer_email"]],
+                "shipping_address": row[column["shipping_address"]],
+                "payment_method": payment_method,
+                "discount_type": discount_type if discount_type_value else None,
+                "discount_value": discount_value,
+                "shipping_charges": shipping_charge,
+                "items": [],
+                "line_numbers": []
+            }
+        orders_data[group_id]["items"].append({
+            "sku": row[column["item_sku"]],
+            "quantity": int(item_quantity),
+            "line_number": line_number
+        })
+        orders_data[group_id]["line_numbers"].append(line_number)
+
+    return original_fieldnames, orders_data, failed_rows, initial_rows_by_group
+
+ORDER_ITEM_COLUMNS = ("order_id", "product_id", "quantity")
+# Text-format COPY: one tab-separated line per row
+ORDER_ITEMS_COPY = f"COPY order_items ({', '.join(ORDER_ITEM_COLUMNS)}) FROM STDIN"
+
+def insert_order_items(db: Session, item_rows: List[Tuple[int, int, int]]):
+    """
+    Writes (order_id, product_id, quantity) rows in the session's transaction. On PostgreSQL
+    they are streamed with COPY FROM STDIN, which skips per-row statement parsing and
+    parameter binding; other databases get a single executemany INSERT.
+    """
+    connection = db.connection()
+    driver = connection.dialect.driver
+    if driver == "psycopg2":
+        # Every column is an integer, so the rows need no quoting or escaping
+        buffer = io.StringIO("".join(f"{order_id}\t{product_id}\t{quantity}\n" for order_id, product_id, quantity in item_rows))
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(ORDER_ITEMS_COPY, buffer)
+    elif driver == "psycopg":
+        with connection.connection.cursor() as cursor:
+            with cursor.copy(ORDER_ITEMS_COPY) as copy:
+                for item_row in item_rows:
+                    copy.write_row(item_row)
+    else:
+        db.execute(insert(models.OrderItem), [dict(zip(ORDER_ITEM_COLUMNS, item_row)) for item_row in item_rows])
+
+
+# --- Orders CSV Upload ---
+@router.post("/upload-csv", response_model=OrderUploadResponse)
+async def upload_orders_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Bulk imports orders. If errors occur, stores failed rows
+    and returns an ID to download them.
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Invalid file type.")
+
+    # Parsing and validation are synchronous and CPU-heavy, so they run in the threadpool
+    original_fieldnames, orders_data, failed_rows, initial_rows_by_group = await run_in_threadpool(parse_orders_csv, file.file)
 
     valid_orders_data = {k: v for k, v in orders_data.items() if not v.get("has_error")}
 
     if not valid_orders_data and not failed_rows:
         raise HTTPException(status_code=400, detail="No valid order data found.")
 
+    # Line numbers already in failed_rows, so a row is never reported twice (O(1) membership)
+    failed_line_numbers = {row["line_number"] for row in failed_rows}
+
     orders_created_count = 0
     db_errors: List[Dict[str, Any]] = []
+    # Column values for each accepted order, and its (product, quantity) items in the same order
+    order_rows: List[Dict[str, Any]] = []
+    order_items: List[List[Dict[str, Any]]] = []
 
     try:
-        with db.begin_nested(): 
-            for group_id, order_info in valid_orders_data.items():
-                subtotal = 0.0
-                total_gst = 0.0
-                db_items_to_add = []
-                products_to_update = []
-                item_details_for_discount = []
-                current_order_failed = False
-
-                try:
-                    for item in order_info["items"]:
-                        product = db.query(models.Product).filter(models.Product.sku == item["sku"]).with_for_update().first()
-                        if not product: raise Exception(f"Item SKU '{item['sku']}' (Line {item['line_number']}) not found.")
-                        if product.stock_quantity < item["quantity"]: raise Exception(f"Not enough stock for {product.name} (SKU: {item['sku']}, Line {item['line_number']}). Avail:{product.stock_quantity}, Req:{item['quantity']}")
-                        if product.selling_price is None: raise Exception(f"Selling price not set for {product.name} (SKU: {item['sku']}, Line {item['line_number']}).")
-                        if product.gst_rate is None: raise Exception(f"GST Rate not set for {product.name} (SKU: {item['sku']}, Line {item['line_number']}).")
-
-                        item_subtotal = product.selling_price * item["quantity"]
-                        subtotal += item_subtotal
-                        db_items_to_add.append({"product": product, "quantity": item["quantity"]})
-                        item_details_for_discount.append({"price": item_subtotal, "gst_rate": product.gst_rate})
-                        products_to_update.append(product)
-
-                    total_discount_amount = 0.0
-                    discount_value = order_info["discount_value"]
-                    discount_type = order_info["discount_type"]
-                    if discount_type and discount_value > 0:
-                        if discount_type == schemas.DiscountType.percentage: total_discount_amount = subtotal * (discount_value / 100)
-                        elif discount_type == schemas.DiscountType.fixed:
-                            total_discount_amount = discount_value
-                            if total_discount_amount > subtotal: raise Exception("Fixed discount > subtotal.")
-                    
-                    for i, item_detail in enumerate(item_details_for_discount):
-                        item_price, item_gst_rate = item_detail["price"], item_detail["gst_rate"]
-                        item_discount = (item_price / subtotal * total_discount_amount) if subtotal > 0 else 0
-                        taxable_value = item_price - item_discount
-                        total_gst += taxable_value * (item_gst_rate / 100)
+        # Fetch every SKU referenced by the valid orders in one query, locking the rows
+        # (in id order) until commit so concurrent imports cannot oversell the same stock
+        order_skus = {item["sku"] for order_info in valid_orders_data.values() for item in order_info["items"]}
+        products_by_sku = {
+            product.sku: product
+            for product in db.query(models.Product)
+            .options(lazyload(models.Product.images))
+            .filter(models.Product.sku.in_(sorted(order_skus)))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .all()
+        } if order_skus else {}
+
+        for group_id, order_info in valid_orders_data.items():
+            subtotal = 0.0
+            pre_discount_gst = 0.0  # GST if no discount applied: sum(item_total * gst_rate / 100)
+            db_items_to_add = []
+            current_order_failed = False
+
+            try:
+                for item in order_info["items"]:
+                    product = products_by_sku.get(item["sku"])
+                    if not product: raise Exception(f"Item SKU '{item['sku']}' (Line {item['line_number']}) not found.")
+                    if product.stock_quantity < item["quantity"]: raise Exception(f"Not enough stock for {product.name} (SKU: {item['sku']}, Line {item['line_number']}). Avail:{product.stock_quantity}, Req:{item['quantity']}")
+                    if product.selling_price is None: raise Exception(f"Selling price not set for {product.name} (SKU: {item['sku']}, Line {item['line_number']}).")
+                    if product.gst_rate is None: raise Exception(f"GST Rate not set for {product.name} (SKU: {item['sku']}, Line {item['line_number']}).")
+
+                    # Subtotal and pre-discount GST in the same pass
+                    item_subtotal = product.selling_price * item["quantity"]
+                    subtotal += item_subtotal
+                    pre_discount_gst += item_subtotal * (product.gst_rate / 100)
+                    db_items_to_add.append({"product": product, "quantity": item["quantity"]})
+
+                total_discount_amount = 0.0
+                discount_value = order_info["discount_value"]
+                discount_type = order_info["discount_type"]
+                if discount_type and discount_value > 0:
+                    if discount_type == schemas.DiscountType.percentage: total_discount_amount = subtotal * (discount_value / 100)
+                    elif discount_type == schemas.DiscountType.fixed:
+                        total_discount_amount = discount_value
+                        if total_discount_amount > subtotal: raise Exception("Fixed discount > subtotal.")
                     
-                    grand_total = (subtotal - total_discount_amount) + total_gst + order_info["shipping_charges"]
+                # The discount is spread over items in proportion to their price, so every item's
+                # taxable value is item_total * (1 - discount / subtotal) and the per-item GST sum
+                # is the pre-discount GST scaled by that common factor (same as create_order)
+                total_gst = pre_discount_gst
+                if subtotal > 0 and total_discount_amount > 0:
+                    total_gst = pre_discount_gst * (1 - total_discount_amount / subtotal)
+
+                grand_total = (subtotal - total_discount_amount) + total_gst + order_info["shipping_charges"]
+
+                db_order_data = order_info.copy()
+                del db_order_data["items"]
+                del db_order_data["line_numbers"]
+
+                order_rows.append({
+                    **db_order_data,
+                    "subtotal": round(subtotal, 2),
+                    "total_gst": round(total_gst, 2),
+                    "total_amount": round(grand_total, 2),
+                    "payment_status": schemas.PaymentStatus.Unpaid,
+                    "status": schemas.OrderStatus.Pending
+                })
+                order_items.append(db_items_to_add)
 
-                    db_order_data = order_info.copy()
-                    del db_order_data["items"]
-                    del db_order_data["line_numbers"]
-                    
-                    db_order = models.Order(
-                        **db_order_data,
-                        subtotal=round(subtotal, 2),
-                        total_gst=round(total_gst, 2),
-                        total_amount=round(grand_total, 2),
-                        payment_status=schemas.PaymentStatus.Unpaid,
-                        status=schemas.OrderStatus.Pending
-                    )
-                    db.add(db_order)
-                    db.flush()
-
-                    for item_to_add in db_items_to_add:
-                        product, quantity = item_to_add["product"], item_to_add["quantity"]
-                        order_item = models.OrderItem(order_id=db_order.id, product_id=product.id, quantity=quantity)
-                        db.add(order_item)
-                        product.stock_quantity -= quantity
-                        
-                        # --- IMPORTANT: IMPORTED FUNCTION KA ISTEMAL ---
-                        # '_update_product_status_local' ki jagah
-                        # update_product_status_dynamically(product, db)
+                # Reserve the stock on the shared Product objects so later orders in this
+                # file are checked against what is left; the UPDATEs are flushed on commit
+                for item_to_add in db_items_to_add:
+                    item_to_add["product"].stock_quantity -= item_to_add["quantity"]
 
-                    orders_created_count += 1
+                orders_created_count += 1
 
-                except Exception as e:
-                    current_order_failed = True
-                    error_reason = f"Order creation failed: {e}"
-                    db_errors.append({"group_id": group_id, "error": error_reason})
+            except Exception as e:
+                current_order_failed = True
+                error_reason = f"Order creation failed: {e}"
+                db_errors.append({"group_id": group_id, "error": error_reason})
                     
-                    if group_id in initial_rows_by_group:
-                        for original_row in initial_rows_by_group[group_id]:
-                            if not any(fr.get("line_number") == original_row.get("line_number") for fr in failed_rows):
-                                row_copy = dict(original_row)
-                                row_copy["error_reason"] = error_reason
-                                failed_rows.append(row_copy)
-                    
-                    db.rollback() 
-                    continue 
-
-            db.commit()
+                if group_id in initial_rows_by_group:
+                    for original_line_number, original_row in initial_rows_by_group[group_id]:
+                        if original_line_number not in failed_line_numbers:
+                            failed_rows.append(failed_row_dict(original_fieldnames, original_row, original_line_number, error_reason))
+                            failed_line_numbers.add(original_line_number)
+
+                # Nothing has been written for this order yet, so there is nothing to roll back
+                continue 
+
+        # Insert every accepted order in one multi-row INSERT ... RETURNING (ids come back
+        # in parameter order), then stream all of their items in with COPY
+        if order_rows:
+            order_ids = db.scalars(
+                insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True),
+                order_rows
+            ).all()
+            insert_order_items(db, [
+                (order_id, item_to_add["product"].id, item_to_add["quantity"])
+                for order_id, items_to_add in zip(order_ids, order_items)
+                for item_to_add in items_to_add
+            ])
+
+        # One transaction for the whole file: stock updates, orders and items commit together,
+        # and any database error below rolls all of them back
+        db.commit()
 
     except Exception as e:
         db.rollback()
@@ -238,11 +339,10 @@ async def upload_orders_csv(file: UploadFile = File(...), db: Session = Depends(
         
         for group_id in valid_orders_data:
             if group_id in initial_rows_by_group:
-                for original_row in initial_rows_by_group[group_id]:
-                    if not any(fr.get("line_number") == original_row.get("line_number") for fr in failed_rows):
-                        row_copy = dict(original_row)
-                        row_copy["error_reason"] = commit_error_message
-                        failed_rows.append(row_copy)
+                for original_line_number, original_row in initial_rows_by_group[group_id]:
+                    if original_line_number not in failed_line_numbers:
+                        failed_rows.append(failed_row_dict(original_fieldnames, original_row, original_line_number, commit_error_message))
+                        failed_line_numbers.add(original_line_number)
                         
         orders_created_count = 0
 
@@ -250,9 +350,7 @@ async def upload_orders_csv(file: UploadFile = File(...), db: Session = Depends(
     error_strings = [f"Line {row.get('line_number', 'N/A')} (Group ID: {row.get('order_group_id', 'N/A')}): {row['error_reason']}" for row in failed_rows]
 
     if failed_rows:
-        error_report_id = str(uuid.uuid4())
-        # --- SHARED DICTIONARY KA ISTEMAL ---
-        error_reports[error_report_id] = {"headers": original_fieldnames, "rows": failed_rows}
+        error_report_id = await save_error_report(original_fieldnames, failed_rows)
 
     if orders_created_count > 0:
         final_message = f"{orders_created_count} order(s) created successfully."
@@ -273,64 +371,65 @@ async def upload_orders_csv(file: UploadFile = File(...), db: Session = Depends(
 
 # --- Orders Export Endpoint ---
 @router.get("/export-csv")
-async def export_orders_csv(db: Session = Depends(get_db)):
+async def export_orders_csv():
     """
     Exports all orders and their items to a CSV file.
     """
-    output = io.StringIO()
-    headers = [
-        "order_group_id", "customer_name", "customer_email", "shipping_address",
-        "payment_method", "item_sku", "item_quantity",
-        "discount_type", "discount_value", "shipping_charges",
-        "subtotal", "total_gst", "total_amount", "status", "payment_status"
-    ]
-    writer = csv.DictWriter(output, fieldnames=headers)
-    writer.writeheader()
-    orders = db.query(models.Order).options(
-        joinedload(models.Order.items).joinedload(models.OrderItem.product)
-    ).all()
-    
-    for order in orders:
-        if not order.items:
-            writer.writerow({
-                "order_group_id": order.id,
-                "customer_name": order.customer_name,
-                "customer_email": order.customer_email,
-                "shipping_address": order.shipping_address,
-                "payment_method": order.payment_method.value if order.payment_method else None,
-                "item_sku": None,
-                "item_quantity": None,
-                "discount_type": order.discount_type.value if order.discount_type else None,
-                "discount_value": order.discount_value,
-                "shipping_charges": order.shipping_charges,
-                "subtotal": order.subtotal,
-                "total_gst": order.total_gst,
-                "total_amount": order.total_amount,
-                "status": order.status.value if order.status else None,
-                "payment_status": order.payment_status.value if order.payment_status else None,
-            })
-        else:
-            for item in order.items:
-                writer.writerow({
-                    "order_group_id": order.id,
-                    "customer_name": order.customer_name,
-                    "customer_email": order.customer_email,
-                    "shipping_address": order.shipping_address,
-                    "payment_method": order.payment_method.value if order.payment_method else None,
-                    "item_sku": item.product.sku if item.product else None,
-                    "item_quantity": item.quantity,
-                    "discount_type": order.discount_type.value if order.discount_type else None,
-                    "discount_value": order.discount_value,
-                    "shipping_charges": order.shipping_charges,
-                    "subtotal": order.subtotal,
-                    "total_gst": order.total_gst,
-                    "total_amount": order.total_amount,
-                    "status": order.status.value if order.status else None,
-                    "payment_status": order.payment_status.value if order.payment_status else None,
-                })
-    output.seek(0)
+    def iter_csv():
+        """
+        Yields the CSV one batch of EXPORT_BATCH_SIZE rows at a time, reading them through
+        a server-side cursor so neither the rows nor the file sit in memory whole.
+        The body is sent after the endpoint returns, so the stream uses its own session.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_HEADERS)
+        yield output.getvalue().encode()
+
+        stream_db = SessionLocal()
+        try:
+            # One flat row per order item (or per order without items), in header order,
+            # straight from a JOIN: no ORM instances or eager-load queries
+            rows = stream_db.execute(
+                select(
+                    models.Order.id, models.Order.customer_name, models.Order.customer_email,
+                    models.Order.shipping_address, models.Order.payment_method,
+                    models.Product.sku, models.OrderItem.quantity,
+                    models.Order.discount_type, models.Order.discount_value, models.Order.shipping_charges,
+                    models.Order.subtotal, models.Order.total_gst, models.Order.total_amount,
+                    models.Order.status, models.Order.payment_status
+                )
+                .select_from(models.Order)
+                .outerjoin(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+                .outerjoin(models.Product, models.Product.id == models.OrderItem.product_id)
+                .order_by(models.Order.id)
+                .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+            )
+            for batch in rows.partitions():
+                output.seek(0)
+                output.truncate()
+                # The whole batch goes through one writerows call; enum columns come back
+                # as enum members, and the file holds their values
+                writer.writerows(
+                    (
+                        order_id, customer_name, customer_email, shipping_address,
+                        payment_method.value if payment_method else None,
+                        item_sku, item_quantity,
+                        discount_type.value if discount_type else None,
+                        discount_value, shipping_charges, subtotal, total_gst, total_amount,
+                        order_status.value if order_status else None,
+                        payment_status.value if payment_status else None,
+                    )
+                    for (order_id, customer_name, customer_email, shipping_address, payment_method,
+                         item_sku, item_quantity, discount_type, discount_value, shipping_charges,
+                         subtotal, total_gst, total_amount, order_status, payment_status) in batch
+                )
+                yield output.getvalue().encode()
+        finally:
+            stream_db.close()
+
     return StreamingResponse(
-        output,
+        iter_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=orders_export.csv"}
     )
@@ -342,13 +441,8 @@ async def download_orders_template():
     Provides a CSV template file for orders import.
     """
     output = io.StringIO()
-    headers = [
-        "order_group_id", "customer_name", "customer_email", "shipping_address",
-        "payment_method", "item_sku", "item_quantity",
-        "discount_type", "discount_value", "shipping_charges"
-    ]
     writer = csv.writer(output)
-    writer.writerow(headers) # Only write the header row
+    writer.writerow(EXPECTED_HEADERS) # Only write the header row
     
     output.seek(0)
     return StreamingResponse(
@@ -363,8 +457,7 @@ async def download_order_errors(report_id: str):
     """
     Downloads the specific rows that failed during a bulk order upload.
     """
-    # --- SHARED DICTIONARY KA ISTEMAL ---
-    report_data = error_reports.get(report_id)
+    report_data = await get_error_report(report_id)
     
     if not report_data:
         raise HTTPException(status_code=404, detail="Error report not found or expired.")
@@ -373,22 +466,34 @@ async def download_order_errors(report_id: str):
     original_headers = report_data.get("headers", [])
     headers_with_error = original_headers + ["error_reason"]
 
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=headers_with_error, extrasaction='ignore')
-    writer.writeheader()
-
-    for row_dict in failed_rows:
-        row_to_write = {header: row_dict.get(header, "") for header in original_headers}
-        row_to_write["error_reason"] = row_dict.get("error_reason", "Unknown error")
-        writer.writerow(row_to_write)
-
-    output.seek(0)
-
-    # Optional: Remove the report from memory after download
-    # del error_reports[report_id]
+    def iter_csv():
+        """
+        Yields the file EXPORT_BATCH_SIZE rows at a time from one reused buffer. Sizeable
+        chunks (rather than one line per chunk from a StringIO) also let the gzip middleware
+        compress the download effectively.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(headers_with_error)
+
+        # Write each failed row along with its error
+        for start in range(0, len(failed_rows), EXPORT_BATCH_SIZE):
+            writer.writerows(
+                [row_dict.get(header, "") for header in original_headers] + [row_dict.get("error_reason", "Unknown error")]
+                for row_dict in failed_rows[start:start + EXPORT_BATCH_SIZE]
+            )
+            yield output.getvalue().encode()
+            output.seek(0)
+            output.truncate()
+
+        # Header-only file when there are no rows
+        if output.tell():
+            yield output.getvalue().encode()
+
+    # No cleanup needed: the report expires from the store on its own
 
     return StreamingResponse(
-        output,
+        iter_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=order_errors_{report_id}.csv"}
-    )
\ No newline at end of file
+    )
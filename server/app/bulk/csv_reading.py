@@ -0,0 +1,69 @@
+# server/app/bulk/csv_reading.py
+#
+# Reading uploaded CSV files into text-only DataFrames for the bulk import routers.
+
+from typing import Dict, List, Tuple
+import pandas as pd
+
+# First cell of a placeholder row standing in for a row with too many fields
+_RAGGED_ROW_MARKER = "\x00ragged-row:"
+
+
+def _unique_fieldnames(header: List[str]) -> List[str]:
+    """
+    Renames repeated header names the way pandas does ('sku', 'sku.1', ...),
+    so every column can be addressed by name.
+    """
+    seen: Dict[str, int] = {}
+    fieldnames = []
+    for name in header:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        fieldnames.append(f"{name}.{count}" if count else name)
+    return fieldnames
+
+
+def read_upload_csv(csv_file) -> Tuple[pd.DataFrame, Dict[int, List[str]]]:
+    """
+    Reads an uploaded CSV with every column as text (pandas' UnicodeDecodeError,
+    EmptyDataError and ParserError propagate to the caller).
+
+    Rows with more fields than the header never shift columns or reject the file:
+    - extra fields that are all empty (a trailing comma, as Excel writes) are dropped;
+    - any other over-long row is returned in `ragged_rows` ({row position: all its
+      fields}) for the caller to report as a failed row. Its place in the DataFrame is
+      held by an empty row, so row positions still match the file's data rows.
+    Short rows are padded with NaN.
+    """
+    # The header row fixes the width; over-long data rows are then handed to on_bad_line.
+    # The data is read with header=None so pandas never treats an extra field in the first
+    # data row as an index column (which would shift every column left).
+    header = pd.read_csv(
+        csv_file, header=None, nrows=1, dtype=str, keep_default_na=False, engine="python", encoding="utf-8"
+    ).iloc[0].tolist()
+    csv_file.seek(0)
+    width = len(header)
+
+    ragged_fields: List[List[str]] = []
+
+    def on_bad_line(fields: List[str]):
+        if not any(field.strip() for field in fields[width:]):
+            return fields[:width]
+        ragged_fields.append(fields)
+        return [f"{_RAGGED_ROW_MARKER}{len(ragged_fields) - 1}"] + [""] * (width - 1)
+
+    # on_bad_line needs the python parser (the C parser only supports error/warn/skip)
+    df = pd.read_csv(
+        csv_file, header=None, names=range(width), dtype=str, keep_default_na=False,
+        engine="python", encoding="utf-8", on_bad_lines=on_bad_line
+    )
+    df = df.iloc[1:].reset_index(drop=True)  # Drop the header row
+    df.columns = _unique_fieldnames(header)
+
+    ragged_rows = {}
+    if ragged_fields:
+        first_column = df.iloc[:, 0]
+        for position in first_column.index[first_column.str.startswith(_RAGGED_ROW_MARKER, na=False)]:
+            ragged_rows[int(position)] = ragged_fields[int(first_column[position][len(_RAGGED_ROW_MARKER):])]
+            df.iat[position, 0] = ""
+    return df, ragged_rows
@@ -0,0 +1,89 @@
+# server/app/bulk/row_validation.py
+#
+# Batch validation of parsed CSV rows. Kept apart from the routers (imports only the
+# schemas) so process-pool workers can load it without the DB or Redis setup.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from ..schemas import schemas
+
+# Row validators, built once: a list adapter validates a whole batch in one pass.
+# Workers receive the adapter by name, so nothing but plain row dicts is pickled.
+ROW_ADAPTERS = {
+    "product_update": TypeAdapter(List[schemas.ProductBase]),
+    "product_create": TypeAdapter(List[schemas.ProductCreate]),
+}
+
+# Below this many rows, validating in-process is cheaper than shipping rows to workers
+PARALLEL_VALIDATION_MIN_ROWS = 20000
+# Rows sent to a worker per task
+VALIDATION_CHUNK_SIZE = 5000
+
+_validation_pool: Optional[ProcessPoolExecutor] = None
+
+def _pool() -> ProcessPoolExecutor:
+    global _validation_pool
+    if _validation_pool is None:
+        # Imported here, not at module level, so spawned workers never load the app settings
+        from ..config import settings
+        _validation_pool = ProcessPoolExecutor(
+            max_workers=settings.VALIDATION_WORKERS,
+            # Fresh interpreters instead of forks of a process holding DB/Redis connections and threads
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _validation_pool
+
+def shutdown_validation_pool():
+    """
+    Stops the validation workers if any were started; called when the app shuts down.
+    """
+    global _validation_pool
+    if _validation_pool is not None:
+        _validation_pool.shutdown(cancel_futures=True)
+        _validation_pool = None
+
+def validate_rows(adapter_name: str, rows: List[dict]):
+    """
+    Validates a batch of row dicts with the named list TypeAdapter.
+    Returns ({index: model} for valid rows, {index: error message} for invalid rows).
+    """
+    adapter = ROW_ADAPTERS[adapter_name]
+    try:
+        return dict(enumerate(adapter.validate_python(rows))), {}
+    except ValidationError as e:
+        # Each error's loc starts with the index of the offending row
+        messages = {}
+        for error in e.errors():
+            index, *field = error["loc"]
+            messages.setdefault(index, []).append(f"{'.'.join(map(str, field))}: {error['msg']}")
+        valid_indices = [i for i in range(len(rows)) if i not in messages]
+        validated = adapter.validate_python([rows[i] for i in valid_indices])
+        return dict(zip(valid_indices, validated)), {i: "; ".join(m) for i, m in messages.items()}
+
+async def validate_rows_parallel(adapter_name: str, rows: List[dict]):
+    """
+    Same result as validate_rows, computed off the event loop: small batches in the
+    threadpool, large ones split into chunks validated concurrently in a process pool.
+    """
+    if len(rows) < PARALLEL_VALIDATION_MIN_ROWS:
+        return await run_in_threadpool(validate_rows, adapter_name, rows)
+
+    loop = asyncio.get_running_loop()
+    offsets = range(0, len(rows), VALIDATION_CHUNK_SIZE)
+    results = await asyncio.gather(*[
+        loop.run_in_executor(_pool(), validate_rows, adapter_name, rows[offset:offset + VALIDATION_CHUNK_SIZE])
+        for offset in offsets
+    ])
+
+    # Shift each chunk's indices back to positions in the full batch
+    validated: Dict[int, object] = {}
+    errors: Dict[int, str] = {}
+    for offset, (chunk_validated, chunk_errors) in zip(offsets, results):
+        validated.update((offset + index, model) for index, model in chunk_validated.items())
+        errors.update((offset + index, message) for index, message in chunk_errors.items())
+    return validated, errors
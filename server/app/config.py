@@ -1,4 +1,5 @@
 import sys
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import ValidationError
 from fastapi_mail import ConnectionConfig
@@ -7,6 +8,26 @@ from fastapi_mail import ConnectionConfig
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Sync engine pool, sized for FastAPI's threadpool (sync endpoints each hold a session)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    # Async engine pool, kept small: only the settings and logistics endpoints use it.
+    # Each worker can open up to DB_POOL_SIZE + DB_MAX_OVERFLOW + ASYNC_DB_POOL_SIZE +
+    # ASYNC_DB_MAX_OVERFLOW connections, so keep that times the worker count under max_connections.
+    ASYNC_DB_POOL_SIZE: int = 5
+    ASYNC_DB_MAX_OVERFLOW: int = 5
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_CONNECT_TIMEOUT_SECONDS: int = 3
+    # Create missing tables from the models at startup. The Alembic history only holds
+    # incremental changes (no baseline migration creating the tables), so this stays on
+    # by default; turn it off where the schema is already in place to skip the per-table
+    # existence checks each worker runs on boot.
+    CREATE_TABLES_ON_STARTUP: bool = True
+    # Processes per app worker for validating large bulk imports, started on first use
+    VALIDATION_WORKERS: int = 2
+
+    # Redis (shared short-lived state across workers)
+    REDIS_URL: str = "redis://localhost:6379/0"
 
     # Cloudinary
     CLOUDINARY_CLOUD_NAME: str
@@ -36,23 +57,37 @@ class Settings(BaseSettings):
     )
 
 
-try:
-    settings = Settings()
-    print("✅ Configuration (.env) loaded successfully!")
-except ValidationError as e:
-    print("❌ FATAL ERROR: Missing or invalid environment variables in .env file.")
-    print(e)
-    sys.exit(1)
-
-
-# Mail configuration using environment variables
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS
-)
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Loads and validates the settings once per process; every caller gets the same instance.
+    """
+    try:
+        loaded_settings = Settings()
+        print("✅ Configuration (.env) loaded successfully!")
+        return loaded_settings
+    except ValidationError as e:
+        print("❌ FATAL ERROR: Missing or invalid environment variables in .env file.")
+        print(e)
+        sys.exit(1)
+
+
+settings = get_settings()
+
+
+@lru_cache(maxsize=1)
+def get_mail_conf() -> ConnectionConfig:
+    """
+    Mail configuration using environment variables, built on first use
+    (only the password-reset email needs it).
+    """
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.MAIL_USERNAME,
+        MAIL_PASSWORD=settings.MAIL_PASSWORD,
+        MAIL_FROM=settings.MAIL_FROM,
+        MAIL_PORT=settings.MAIL_PORT,
+        MAIL_SERVER=settings.MAIL_SERVER,
+        MAIL_STARTTLS=settings.MAIL_STARTTLS,
+        MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+        USE_CREDENTIALS=settings.USE_CREDENTIALS
+    )
@@ -1,45 +1,72 @@
-import time
-import sys
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
 
 # Import the settings (which include DATABASE_URL)
 from .config import settings
 
-def connect_with_retry():
+def driver_options() -> dict:
     """
-    Attempts to connect to the database with a retry mechanism.
-    This is useful for docker-compose startup sequences.
+    Extra create_engine options for the configured DBAPI driver.
     """
-    retries = 5
-    delay = 2
-    for attempt in range(retries):
-        try:
-            # Try to create an engine and establish a connection
-            engine = create_engine(settings.DATABASE_URL)
-            connection = engine.connect()
-            connection.close()
-            print("✅ Database connection successful!")
-            return engine
-        except OperationalError:
-            # If connection fails (e.g., DB not ready), wait and retry
-            print(f"Database connection failed. Attempt {attempt + 1} of {retries}.")
-            if attempt < retries - 1:
-                print(f"Retrying in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                # If all retries fail, print error and raise the exception
-                print("❌ Could not connect to the database after several retries.")
-                raise
+    driver = make_url(settings.DATABASE_URL).get_driver_name()
+    options = {}
+    if driver in ("psycopg2", "psycopg"):
+        # Give up on an unreachable server after a few seconds instead of the OS TCP timeout
+        options["connect_args"] = {"connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+    if driver == "psycopg2":
+        # Batch executemany UPDATE/DELETEs with execute_batch, not just INSERTs
+        options["executemany_mode"] = "values_plus_batch"
+    return options
 
 # --- Database Setup ---
-# Create the SQLAlchemy engine using the retry logic
-engine = connect_with_retry()
+# The engine connects lazily: the first query opens a connection (and pool_pre_ping replaces
+# any that went stale), so workers start serving right away instead of blocking on the database.
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,  # Transparently replace connections dropped by a DB restart
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    insertmanyvalues_page_size=1000,  # Rows per multi-VALUES INSERT for executemany inserts
+    # Compiled SQL is cached per statement shape; leave room beyond the default 500 for the
+    # IN-list/CASE variants produced by the order and bulk endpoints
+    query_cache_size=1200,
+    **driver_options()
+)
 
-# Create a configured "Session" class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create a configured "Session" class.
+# Sessions live for a single request, so objects are not expired on commit: the
+# response is built from the values the session already holds without re-SELECTs.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# --- Async Setup ---
+# Endpoints that are pure DB I/O use an AsyncSession so they release the event loop
+# between statements instead of holding a threadpool slot for the whole request.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str):
+    """
+    Maps DATABASE_URL onto the async driver for the same database
+    (e.g. postgresql:// -> postgresql+asyncpg://).
+    """
+    db_url = make_url(url)
+    db_url = db_url.set(drivername=ASYNC_DRIVERS.get(db_url.get_backend_name(), db_url.drivername))
+    # asyncpg takes 'ssl' rather than libpq's 'sslmode'
+    if "sslmode" in db_url.query:
+        db_url = db_url.update_query_dict({"ssl": db_url.query["sslmode"]}).difference_update_query(["sslmode"])
+    return db_url
+
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    # A separate, smaller budget than the sync engine (see ASYNC_DB_POOL_SIZE in config.py)
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 # Create a base class for our models to inherit from
 Base = declarative_base()
@@ -53,4 +80,11 @@ def get_db():
     try:
         yield db  # Provide the session to the request
     finally:
-        db.close() # Ensure the session is closed after the request is finished
\ No newline at end of file
+        db.close() # Ensure the session is closed after the request is finished
+
+async def get_async_db():
+    """
+    Async counterpart of get_db for `async def` endpoints.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
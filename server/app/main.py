@@ -1,19 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from .config import settings as config_settings
 from .database import engine
+from .security import warm_up_password_hashing
 from .models import models
 # Import all API router modules
 from .api import analytics, inventory, orders, logistics, users, ai, settings, forecasting
 # Import the specific bulk operation routers
 from .bulk import bulk_inventory, bulk_orders
+from .bulk.row_validation import shutdown_validation_pool
 from .api.customer import catalog as customer_catalog
 # from .api import prediction
 
 
-# Create all database tables (if they don't exist) on app startup
-models.Base.metadata.create_all(bind=engine)
+# Create missing database tables from the models (see CREATE_TABLES_ON_STARTUP in config.py).
+# Columns/indexes added to existing tables are applied with `alembic upgrade head`.
+if config_settings.CREATE_TABLES_ON_STARTUP:
+    models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Supply Chain AI Dashboard API")
+# Load the password hashing backends now rather than during the first login request
+warm_up_password_hashing()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the bulk-import validation processes with the worker
+    shutdown_validation_pool()
+
+app = FastAPI(title="Supply Chain AI Dashboard API", lifespan=lifespan)
 
 # Configure CORS (Cross-Origin Resource Sharing)
 # This allows the React frontend (e.g., from localhost:5173) to make requests to this backend.
@@ -31,6 +47,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip responses for clients that accept it (CSV exports and large JSON lists compress 5-10x).
+# Streamed responses are compressed chunk by chunk; bodies under 1 KB are sent as-is.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # === API Routers ===
 # Include all the modular API routers with their specific prefixes and tags for documentation.
 
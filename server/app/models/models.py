@@ -1,7 +1,7 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, Enum, Boolean, ForeignKey, Text
+    Column, Integer, String, Float, DateTime, Enum, Boolean, ForeignKey, Text, Index, text, Computed
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, query_expression
 from ..database import Base  # Import the declarative base from database config
 import enum
 import datetime
@@ -30,14 +30,13 @@ class PaymentMethod(str, enum.Enum):
 class ShippingProvider(str, enum.Enum):
     Self_Delivery = "Self-Delivery"; BlueDart = "BlueDart"; Delhivery = "Delhivery"; DTDC = "DTDC"
 
-# This Enum is defined but the corresponding column in Product is commented out,
-# as status is calculated dynamically.
-class StockStatus(str, enum.Enum):
-    In_Stock = "In Stock"; Low_Stock = "Low Stock"; Out_of_Stock = "Out of Stock"
-
 class MediaType(str, enum.Enum):
     image = "image"; video = "video"
 
+# The statuses the logistics dashboard filters vehicles by
+class VehicleStatus(str, enum.Enum):
+    Idle = "Idle"; On_Route = "On Route"; In_Shop = "In-Shop"
+
 
 # --- Association & Other Models ---
 
@@ -50,7 +49,8 @@ class OrderItem(Base):
     
     # Relationships to link back to Order and Product models
     order = relationship("Order", back_populates="items")
-    product = relationship("Product")
+    # Joined into the items query, so an order's items arrive with their products
+    product = relationship("Product", lazy="joined")
 
 # Model to store product images and videos, linked to a Product
 class ProductImage(Base):
@@ -83,8 +83,21 @@ class Product(Base):
     name = Column(String, index=True)
     sku = Column(String, unique=True, index=True)
     stock_quantity = Column(Integer)
-    # The 'status' column is commented out because it's calculated dynamically.
-    # status = Column(Enum(StockStatus))
+    # Not stored, as the threshold is a runtime setting; filled per query via
+    # with_expression(Product.status, product_status_expression(...))
+    status = query_expression()
+    # Status against the product's own reorder level (what the storefront shows), kept up to
+    # date by the database on every write. The admin status uses the configurable global
+    # threshold instead, so it stays a per-query expression rather than a stored column.
+    stock_status = Column(
+        String,
+        Computed(
+            "CASE WHEN stock_quantity <= 0 THEN 'Out of Stock' "
+            "WHEN stock_quantity <= reorder_level THEN 'Low Stock' ELSE 'In Stock' END",
+            persisted=True,
+        ),
+        index=True,
+    )
     
     description = Column(Text, nullable=True)
     category = Column(String, index=True, nullable=True)
@@ -98,15 +111,17 @@ class Product(Base):
 
     # One-to-many relationship with ProductImage
     # 'cascade="all, delete-orphan"' ensures images are deleted when a product is deleted.
-    images = relationship("ProductImage", back_populates="product", cascade="all, delete-orphan")
+    # lazy="selectin" loads the images of every product in a result with one IN query
+    # instead of one SELECT per product when the response is serialized.
+    images = relationship("ProductImage", back_populates="product", cascade="all, delete-orphan", lazy="selectin")
 
 # Order model for customer orders
 class Order(Base):
     __tablename__ = "orders"
     id = Column(Integer, primary_key=True, index=True)
-    order_date = Column(DateTime, default=datetime.datetime.utcnow)
+    order_date = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     customer_name = Column(String, index=True)
-    customer_email = Column(String, index=True)
+    customer_email = Column(String)  # Indexed together with order_date below
     phone_number = Column(String, nullable=True) # Optional phone number
     shipping_address = Column(String)
 
@@ -123,11 +138,23 @@ class Order(Base):
     payment_method = Column(Enum(PaymentMethod))
     status = Column(Enum(OrderStatus), default=OrderStatus.Pending)
     shipping_provider = Column(Enum(ShippingProvider), nullable=True)
-    tracking_id = Column(String, nullable=True, index=True)
+    tracking_id = Column(String, nullable=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=True)
     
-    # Relationship to OrderItem association table
-    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    # Relationship to OrderItem association table (loaded for all orders in a result with one IN query)
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", lazy="selectin")
+
+    __table_args__ = (
+        # A customer's order history, newest first (also serves plain customer_email lookups)
+        Index("ix_orders_email_date", customer_email, order_date.desc()),
+        # Only the still-open orders; the enum column stores member names, hence 'In_Transit'
+        Index(
+            "ix_orders_open_status", status,
+            postgresql_where=text("status IN ('Pending', 'Processing', 'Shipped', 'In_Transit')"),
+        ),
+        # Most orders have no tracking id yet, so leave those rows out of the index
+        Index("ix_orders_tracking_id", tracking_id, postgresql_where=text("tracking_id IS NOT NULL")),
+    )
 
 # Vehicle model for logistics and tracking
 class Vehicle(Base):
@@ -137,11 +164,16 @@ class Vehicle(Base):
     driver_name = Column(String)
     latitude = Column(Float)
     longitude = Column(Float)
-    status = Column(String, default="Idle") # Could be an Enum(VehicleStatus)
+    status = Column(Enum(VehicleStatus, name="vehiclestatus"), default=VehicleStatus.Idle)
     live_temp = Column(Float)
     orders_count = Column(Integer)
     fuel_level = Column(Float)
 
+    __table_args__ = (
+        # Lets the live map read positions by status from the index alone (index-only scan)
+        Index("ix_vehicles_status_cov", status, postgresql_include=["latitude", "longitude", "live_temp"]),
+    )
+
 # Model for storing application-wide settings (e.g., low stock threshold)
 class AppSettings(Base):
     __tablename__ = 'app_settings'
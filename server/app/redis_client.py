@@ -0,0 +1,9 @@
+import redis.asyncio as redis
+
+# Import the settings (which include REDIS_URL)
+from .config import settings
+
+# --- Redis Setup ---
+# One connection pool per process, shared by every request.
+# Used for short-lived state that must be visible to all workers (e.g. password-reset OTPs).
+redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -1,14 +1,7 @@
-from pydantic import BaseModel, validator, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
 from typing import Optional, List, Dict
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
-from jose import jwt
-from passlib.context import CryptContext
-
-# --- Configuration & Security ---
-SECRET_KEY = "this-is-my-secret-key-123456789012"
-ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # --- Enums ---
 class UserRole(str, Enum):
@@ -49,6 +42,11 @@ class ShippingProvider(str, Enum):
     Delhivery = "Delhivery"
     DTDC = "DTDC"
 
+class VehicleStatus(str, Enum):
+    Idle = "Idle"
+    On_Route = "On Route"
+    In_Shop = "In-Shop"
+
 class StockStatus(str, Enum):
     In_Stock = "In Stock"
     Low_Stock = "Low Stock"
@@ -75,8 +73,7 @@ class UserUpdate(BaseModel):
 class User(UserBase):
     id: int
     is_active: bool
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -92,8 +89,7 @@ class ProductImageResponse(BaseModel):
     id: int
     media_url: str
     media_type: MediaType
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProductImageCreate(BaseModel):
     media_url: str
@@ -132,8 +128,7 @@ class Product(ProductBase):
     id: int
     images: List[ProductImageResponse] = []
     status: StockStatus
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # --- Vehicle Schemas ---
 class VehicleBase(BaseModel):
@@ -141,7 +136,7 @@ class VehicleBase(BaseModel):
     driver_name: str
     latitude: float
     longitude: float
-    status: str = "Idle"
+    status: VehicleStatus = VehicleStatus.Idle
     live_temp: float = 25.0
     orders_count: int = 0
     fuel_level: float = 100.0
@@ -151,29 +146,25 @@ class VehicleCreate(VehicleBase):
 
 class Vehicle(VehicleBase):
     id: int
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # --- Order & Item Schemas ---
 class ItemProductDetail(BaseModel):
     name: str
     sku: str
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ItemProductDetailWithPrice(BaseModel):
     name: str
     sku: str
     selling_price: float
     gst_rate: float
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ItemInOrderResponse(BaseModel):
     quantity: int
     product: ItemProductDetailWithPrice
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -220,7 +211,8 @@ class OrderUpdate(BaseModel):
     tracking_id: Optional[str] = None
     vehicle_id: Optional[int] = None
 
-    @validator("shipping_provider", pre=True)
+    @field_validator("shipping_provider", mode="before")
+    @classmethod
     def empty_str_to_none(cls, v):
         if v == "": return None
         return v
@@ -229,8 +221,7 @@ class Order(OrderBase):
     id: int
     order_date: datetime
     items: List[ItemInOrderResponse]
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # --- Analytics & Forecast Schemas ---
 class KpiCard(BaseModel):
@@ -255,8 +246,7 @@ class AnalyticsSummary(BaseModel):
     top_selling_products: List[TopProduct]
     delivery_status: DeliveryStatusChart
     order_status_breakdown: List[OrderStatusBreakdownItem]
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ForecastDataPoint(BaseModel):
     date: str
@@ -269,21 +259,7 @@ class DemandForecast(BaseModel):
 class AppSetting(BaseModel):
     setting_key: str
     setting_value: str
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AppSettingsUpdate(BaseModel):
     settings: List[AppSetting]
-
-# --- Helper Functions ---
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(hours=24)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
@@ -1,5 +1,30 @@
-from typing import Dict, Any
+import uuid
+from typing import Dict, Any, List, Optional
 
-# A shared, in-memory store for holding temporary error reports (e.g., CSV import errors)
-# This dictionary maps a report_id (str) to the report data.
-error_reports: Dict[str, Dict[str, Any]] = {}
\ No newline at end of file
+import orjson
+
+from ..redis_client import redis_client
+
+# Temporary error reports (e.g., CSV import errors) live in Redis, so any worker can serve
+# the download and each report is dropped automatically once it expires.
+# A report is stored as JSON: {"headers": [...], "rows": [...]}
+ERROR_REPORT_TTL_SECONDS = 3600  # 1 hour
+
+def _error_report_key(report_id: str) -> str:
+    return f"errreport:{report_id}"
+
+async def save_error_report(headers: List[str], rows: List[Dict[str, Any]]) -> str:
+    """
+    Stores the failed rows of an import and returns the report_id to download them with.
+    """
+    report_id = str(uuid.uuid4())
+    payload = orjson.dumps({"headers": headers, "rows": rows}, option=orjson.OPT_NON_STR_KEYS)
+    await redis_client.set(_error_report_key(report_id), payload, ex=ERROR_REPORT_TTL_SECONDS)
+    return report_id
+
+async def get_error_report(report_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns a stored report, or None if it does not exist or has expired.
+    """
+    payload = await redis_client.get(_error_report_key(report_id))
+    return orjson.loads(payload) if payload else None
@@ -1,48 +1,77 @@
 # server/app/utils/settings_helpers.py
 
+import time
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 from ..models import models
 from ..schemas import schemas
 
 # --- Central helper functions for application settings ---
 
+# Settings change rarely, so all of them are kept in memory as one snapshot for a short
+# TTL instead of being read on every inventory/analytics request. A miss reloads every
+# key in one query. Other worker processes pick up a change once their snapshot expires.
+SETTINGS_CACHE_TTL_SECONDS = 60
+_settings_snapshot: dict[str, str] = {}  # setting_key -> setting_value
+_snapshot_expires_at = 0.0
+
+def invalidate_settings_cache():
+    """
+    Drops the cached settings so the next lookup reads the database.
+    Call this after app settings are changed.
+    """
+    global _snapshot_expires_at
+    _snapshot_expires_at = 0.0
+
+def get_setting_value(db: Session, setting_key: str) -> str | None:
+    """
+    Returns the stored value of an app setting (from the cached snapshot),
+    or None if the setting does not exist.
+    """
+    global _settings_snapshot, _snapshot_expires_at
+    if _snapshot_expires_at <= time.monotonic():
+        _settings_snapshot = dict(
+            db.query(models.AppSettings.setting_key, models.AppSettings.setting_value).all()
+        )
+        _snapshot_expires_at = time.monotonic() + SETTINGS_CACHE_TTL_SECONDS
+    return _settings_snapshot.get(setting_key)
+
 def get_low_stock_threshold(db: Session) -> int:
     """
-    Fetches the 'LOW_STOCK_THRESHOLD' setting from the database.
+    Fetches the 'LOW_STOCK_THRESHOLD' setting.
     Returns 10 as a default if the setting is not found or is invalid.
     """
-    setting = db.query(models.AppSettings).filter(
-        models.AppSettings.setting_key == "LOW_STOCK_THRESHOLD"
-    ).first()
+    value = get_setting_value(db, "LOW_STOCK_THRESHOLD")
     # Check if setting exists and its value is a valid integer
-    if setting and setting.setting_value.isdigit():
-        return int(setting.setting_value)
+    if value and value.isdigit():
+        return int(value)
     return 10  # Default value
 
+# Indexed by (stock_quantity > 0) + (stock_quantity > threshold)
+_STOCK_STATUSES = (
+    schemas.StockStatus.Out_of_Stock,
+    schemas.StockStatus.Low_Stock,
+    schemas.StockStatus.In_Stock,
+)
+
 def get_product_status(stock_quantity: int, low_stock_threshold: int) -> schemas.StockStatus:
     """
     Calculates the correct StockStatus enum based on stock level and threshold.
     This is a pure helper function and does not modify the database.
     """
-    if stock_quantity <= 0:
-        return schemas.StockStatus.Out_of_Stock
-    elif stock_quantity <= low_stock_threshold:
-        return schemas.StockStatus.Low_Stock
-    else:
-        return schemas.StockStatus.In_Stock
-
-def update_product_status_dynamically(product: models.Product, db: Session):
-    """
-    (Note: This function attempts to set a 'status' attribute on the DB model,
-    which may not exist. Status is typically calculated for the response.)
-    Updates a product's status based on the dynamic threshold.
-    """
-    threshold = get_low_stock_threshold(db)
-    
-    if product.stock_quantity <= 0:
-        product.stock_quantity = 0 # Ensure stock isn't negative
-        product.status = models.StockStatus.Out_of_Stock
-    elif product.stock_quantity <= threshold:
-        product.status = models.StockStatus.Low_Stock
-    else:
-        product.status = models.StockStatus.In_Stock
\ No newline at end of file
+    # Two comparisons summed into a tuple index instead of an if/elif chain; clamping the
+    # threshold at 0 keeps empty stock Out of Stock even for a negative threshold.
+    return _STOCK_STATUSES[(stock_quantity > 0) + (stock_quantity > max(low_stock_threshold, 0))]
+
+def product_status_expression(low_stock_threshold):
+    """
+    SQL equivalent of get_product_status, so list queries can return the status
+    column directly instead of computing it per row in Python.
+    The threshold is either a number or a column (e.g. Product.reorder_level);
+    a NULL threshold never matches, so those products count as In Stock.
+    """
+    return case(
+        (models.Product.stock_quantity <= 0, schemas.StockStatus.Out_of_Stock.value),
+        (models.Product.stock_quantity <= low_stock_threshold, schemas.StockStatus.Low_Stock.value),
+        else_=schemas.StockStatus.In_Stock.value
+    )
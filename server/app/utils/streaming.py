@@ -0,0 +1,47 @@
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from starlette.background import BackgroundTask
+
+from ..database import SessionLocal
+
+# Rows fetched (and eager-load batches issued) per round-trip while streaming
+STREAM_YIELD_PER = 100
+
+
+def stream_json_array(stmt: Select, schema: type[BaseModel], yield_per: int = STREAM_YIELD_PER) -> StreamingResponse:
+    """
+    Streams the ORM rows selected by `stmt` as a JSON array, serializing each one
+    through `schema`, so memory stays at `yield_per` rows regardless of the page size.
+    Each batch of rows goes out as one chunk, so GZipMiddleware compresses whole
+    batches instead of flushing after every row.
+
+    The response uses its own session: the body is produced after the endpoint
+    returns, so it cannot rely on the request's get_db session still being open.
+    Call this from a sync endpoint (it runs the first query before returning).
+    """
+    def serialize(rows) -> bytes:
+        return b",".join(orjson.dumps(schema.model_validate(row).model_dump()) for row in rows)
+
+    db = SessionLocal()
+    try:
+        batches = db.scalars(stmt.execution_options(yield_per=yield_per)).partitions()
+        # Query and serialize the first batch before the response starts, so a failure
+        # there is still raised as a 500 rather than a 200 with a truncated array
+        first_chunk = b"[" + serialize(next(batches, []))
+    except BaseException:
+        db.close()
+        raise
+
+    def generate():
+        try:
+            yield first_chunk
+            for rows in batches:
+                yield b"," + serialize(rows)
+            yield b"]"
+        finally:
+            db.close()
+
+    # Also close the session if the body is never iterated (e.g. the client went away)
+    return StreamingResponse(generate(), media_type="application/json", background=BackgroundTask(db.close))
@@ -1,13 +1,12 @@
 # server/seed.py
 
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
 
 from app.models import models
 from app.database import Base
-from app.models.models import StockStatus
 
 load_dotenv()
 
@@ -21,25 +20,27 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base.metadata.create_all(bind=engine)
 
-db = SessionLocal()
-
-def seed_products():
+def seed_products(db: Session):
     print("Seeding products...")
     products_to_add = [
         # ... (aapke products waise hi rahenge) ...
     ]
+    # One query for the SKUs already present instead of one lookup per product
+    existing_skus = set(db.scalars(
+        select(models.Product.sku).where(models.Product.sku.in_([p.sku for p in products_to_add]))
+    ))
+    new_products = []
     for product in products_to_add:
-        existing_product = db.query(models.Product).filter(models.Product.sku == product.sku).first()
-        if not existing_product:
-            db.add(product)
+        if product.sku not in existing_skus:
+            new_products.append(product)
             print(f"Product added: {product.name}")
         else:
             print(f"Product '{product.name}' already exists. Skipping.")
-    db.commit()
+    db.add_all(new_products)
     print("✅ Products seeding complete!")
 
 # --- YEH NAYA FUNCTION ADD KIYA GAYA HAI ---
-def seed_vehicles():
+def seed_vehicles(db: Session):
     print("Seeding vehicles...")
     # Optional: Clear existing vehicles to start fresh
     # db.query(models.Vehicle).delete()
@@ -50,7 +51,7 @@ def seed_vehicles():
             driver_name="Ramesh Kumar",
             latitude=18.5204,
             longitude=73.8567,
-            status="Idle",
+            status=models.VehicleStatus.Idle,
             live_temp=25.5,
             orders_count=0,
             fuel_level=80.0
@@ -60,29 +61,28 @@ def seed_vehicles():
             driver_name="Suresh Singh",
             latitude=18.5314,
             longitude=73.8446,
-            status="Idle",
+            status=models.VehicleStatus.Idle,
             live_temp=26.1,
             orders_count=0,
             fuel_level=75.5
         )
     ]
 
-    for vehicle in vehicles_to_add:
-        existing = db.query(models.Vehicle).filter(
-            models.Vehicle.vehicle_number == vehicle.vehicle_number
-        ).first()
-        if not existing:
-            db.add(vehicle)
-            print(f"Vehicle added: {vehicle.vehicle_number}")
-
-    db.commit()
+    existing_numbers = set(db.scalars(
+        select(models.Vehicle.vehicle_number)
+        .where(models.Vehicle.vehicle_number.in_([v.vehicle_number for v in vehicles_to_add]))
+    ))
+    new_vehicles = [v for v in vehicles_to_add if v.vehicle_number not in existing_numbers]
+    for vehicle in new_vehicles:
+        print(f"Vehicle added: {vehicle.vehicle_number}")
+    db.add_all(new_vehicles)
     print("✅ Vehicles seeding complete!")
 
 
 if __name__ == "__main__":
-    try:
+    # One transaction for the whole seed: it commits once at the end, or rolls back
+    # everything (and closes the session) if either step fails
+    with SessionLocal.begin() as db:
         # Dono functions ko yahan call karein
-        seed_products()
-        seed_vehicles()
-    finally:
-        db.close()
\ No newline at end of file
+        seed_products(db)
+        seed_vehicles(db)
\ No newline at end of file